@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class TTLCache:
+    """In-process cache with time-based expiration and size-bounded LRU eviction.
+
+    Concurrent callers asking for the same missing key share a single in-flight fetch.
+
+    Attributes
+    ----------
+    ttl : float
+        how many seconds an entry stays valid after it has been stored
+    maxsize : int
+        maximum amount of entries, least recently used entries are evicted first
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """Return value stored under given key, if it is present and not expired.
+
+        :param key: Cache key.
+        :return: Cached value.
+        :raises KeyError: When key is not present or entry has expired.
+        """
+        expires_at, value = self._entries[key]
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            raise KeyError(key)
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under given key, evicting the least recently used entries if cache is full.
+
+        :param key: Cache key.
+        :param value: Value to be stored.
+        :return: None
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """Remove entry with given key from the cache. If no key is provided, removes all entries.
+
+        :param key: Cache key.
+        :return: None
+        """
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable]) -> Any:
+        """Return value stored under given key. If it is missing, await given coroutine function and store the result.
+        When fetch for the same key is already running, waits for its result instead of starting a new one.
+
+        :param key: Cache key.
+        :param fetch: Coroutine function called without arguments, that returns the value to be stored.
+        :return: Cached or freshly fetched value.
+        """
+        try:
+            return self.get(key)
+        except KeyError:
+            pass
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._pending[key] = task
+            task.add_done_callback(lambda t: self._on_fetched(key, t))
+        # Shielded, so one cancelled caller does not cancel the fetch shared with the others.
+        return await asyncio.shield(task)
+
+    def _on_fetched(self, key: Hashable, task: asyncio.Future) -> None:
+        self._pending.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.set(key, task.result())
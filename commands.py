@@ -1,12 +1,11 @@
-import asyncio
-
 import discord
 from discord.ext import commands
 
 import crud
 import settings
 import strings
-from deal import NoDealsFound, get_deals, get_embed_from_deal, get_random_deal
+from deal import DealSnapshot, NoDealsFound, get_deals, get_embed_from_deal, get_random_deal
+from flipbook import FlipbookManager
 from tasks import ScheduledTasks, guilds__running_tasks
 
 
@@ -17,6 +16,7 @@ class Commands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot: commands.Bot = bot
         self.scheduled_tasks_cog: ScheduledTasks = self.bot.get_cog('ScheduledTasks')
+        self.flipbook_manager: FlipbookManager = self.bot.get_cog('FlipbookManager')
 
     @commands.command(name='update',
                       brief=strings.COMMAND_UPDATE_BRIEF,
@@ -39,7 +39,7 @@ class Commands(commands.Cog):
             if store in ['steam', 'gog', 'all']:
                 await ctx.send(f'```Started updating daily deals for {store.capitalize()}```')
                 deals_list = await get_deals(amount=deals_amount, store=store)
-                await self.scheduled_tasks_cog.deals_task(ctx.guild, deals_list)
+                await self.scheduled_tasks_cog.deals_task(ctx.guild, DealSnapshot(deals_list))
                 await ctx.send(f'```{store.capitalize()} deals have been updated with {len(deals_list)} positions```')
             else:
                 raise discord.ext.commands.BadArgument
@@ -93,56 +93,9 @@ class Commands(commands.Cog):
                       description=strings.COMMAND_FLIP_DESC)
     async def flip(self, ctx: commands.Context, min_price: int = 0, max_price: int = 60):
         try:
-            deals_list = await get_deals(min_price=min_price, max_price=max_price, amount=60)
+            await self.flipbook_manager.open(ctx, min_price, max_price)
         except NoDealsFound:
             await ctx.send(content='```No deals found within specified price range```')
-            return
-        start_message = await ctx.send(content=f"```Here's a flipbook of deals for you, {ctx.author.name}!```")
-        pages = len(deals_list)
-        current_page = 1
-        deal = deals_list[0]
-        message = await ctx.send(content=f'**Page {current_page}/{pages}**',
-                                 embed=get_embed_from_deal(deal))
-        await message.add_reaction('◀️')
-        await message.add_reaction('▶️')
-        active = True
-
-        def check(_reaction, _user):
-            return (_user != self.bot.user
-                    and str(_reaction.emoji) in ['◀️', '▶️']
-                    and _reaction.message == message)
-
-        while active:
-            try:
-                reaction, user = await self.bot.wait_for('reaction_add', timeout=120, check=check)
-
-                if user != ctx.author:
-                    await message.remove_reaction(reaction, user)
-                    continue
-
-                if str(reaction.emoji) == '▶️':
-                    if current_page == pages:
-                        current_page = 1
-                    else:
-                        current_page += 1
-                    deal = deals_list[current_page - 1]
-                    await message.edit(content=f'**Page {current_page}/{pages}**',
-                                       embed=get_embed_from_deal(deal))
-                    await message.remove_reaction(reaction, user)
-
-                if str(reaction.emoji) == '◀️':
-                    if current_page == 1:
-                        current_page = pages
-                    else:
-                        current_page -= 1
-                    deal = deals_list[current_page - 1]
-                    await message.edit(content=f'**Page {current_page}/{pages}**',
-                                       embed=get_embed_from_deal(deal))
-                    await message.remove_reaction(reaction, user)
-            except asyncio.TimeoutError:
-                await start_message.delete()
-                await message.delete()
-                active = False
 
     @flip.error
     async def flip_handler(self, ctx: commands.Context, error):
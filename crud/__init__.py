@@ -1,3 +1,9 @@
+from .base import transaction
+from .cache import config_cache
 from .crud_category import category
 from .crud_channel import channel
+from .crud_deal import deal
+from .crud_delivery import delivery
 from .crud_guild import guild
+from .crud_message import message
+from .instrumentation import database
@@ -1,13 +1,57 @@
-from typing import Generic, List, Type, TypeVar
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Callable, Generic, List, Optional, Type, TypeVar
 
 from asyncpg import Record
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.postgresql import insert
 
+from crud.instrumentation import database
 from database.base import Base
-from database.session import database
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 
+# Writes to the configuration cache made inside the current transaction, applied once it is committed.
+_pending_cache_writes: ContextVar[Optional[List[Callable[[], None]]]] = ContextVar('pending_cache_writes', default=None)
+
+
+@asynccontextmanager
+async def transaction():
+    """Asynchronous context manager that runs all CRUD operations inside it in a single database transaction.
+
+    Writes to the configuration cache are held back until the transaction is committed, so a rolled back transaction
+    leaves the cache untouched. Writes of a nested transaction are added to the outer one.
+    """
+    outer_writes = _pending_cache_writes.get()
+    token = _pending_cache_writes.set([])
+    try:
+        async with database.transaction():
+            yield
+        writes = _pending_cache_writes.get()
+    finally:
+        _pending_cache_writes.reset(token)
+    if outer_writes is not None:
+        outer_writes.extend(writes)
+    else:
+        for write in writes:
+            write()
+
+
+def write_to_cache(write: Callable[[], None]) -> None:
+    """Apply a write to the configuration cache, or hold it back until the current transaction is committed.
+
+    :param write: Function applying the write.
+    :return: None
+    """
+    writes = _pending_cache_writes.get()
+    if writes is None:
+        write()
+    else:
+        writes.append(write)
+
+
 class CRUDBase(Generic[ModelType]):
     def __init__(self, model: Type[ModelType]):
         """CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -44,6 +88,15 @@ class CRUDBase(Generic[ModelType]):
         query = self.model.__table__.select().where(name == self.model.name)
         return await database.fetch_one(query=query)
 
+    async def get_many(self, ids: List[int]) -> List[Record]:
+        """Return records with given object IDs.
+
+        :param ids: Database object ids.
+        :return: List of Records objects containing data.
+        """
+        query = self.model.__table__.select().where(self.model.id.in_(ids))
+        return await database.fetch_all(query=query)
+
     async def get_all(self) -> List[Record]:
         """Return list of all records.
 
@@ -71,7 +124,69 @@ class CRUDBase(Generic[ModelType]):
         query = (
             self.model.__table__.update().where(id == self.model.id).values(**obj_in)
         )
-        return await database.execute(query=query)
+        result = await database.execute(query=query)
+        write_to_cache(partial(self._cache_update, id, obj_in))
+        return result
+
+    async def upsert_many(self,
+                          objs_in: List[dict],
+                          index_elements: List[str],
+                          update_columns: List[str] = None) -> List[Record]:
+        """Insert multiple objects with a single INSERT ... ON CONFLICT DO UPDATE statement.
+
+        :param objs_in: List of dicts containing required attributes, all with the same keys.
+        :param index_elements: Columns of the unique constraint used to detect conflicts.
+        :param update_columns: Columns updated when the object already exists. Default is all columns that are not
+            in index_elements.
+        :return: List of Records objects containing data of inserted and updated objects.
+        """
+        if not objs_in:
+            return []
+        if update_columns is None:
+            update_columns = [column for column in objs_in[0].keys() if column not in index_elements]
+        query = insert(self.model.__table__).values(objs_in)
+        query = query.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: query.excluded[column] for column in update_columns}
+        ).returning(*self.model.__table__.columns)
+        db_objs = await database.fetch_all(query=query)
+        for db_obj in db_objs:
+            write_to_cache(partial(self._cache_put, dict(db_obj)))
+        return db_objs
+
+    async def update_many(self, objs_in: List[dict]) -> None:
+        """Update multiple objects, each with its own values, with a single prepared statement.
+
+        :param objs_in: List of dicts containing id of the object and attributes to update, all with the same keys.
+        :return: None
+        """
+        if not objs_in:
+            return
+        columns = [column for column in objs_in[0].keys() if column != 'id']
+        query = (
+            self.model.__table__.update()
+            .where(self.model.id == bindparam('_id'))
+            .values({column: bindparam(column) for column in columns})
+        )
+        # databases applies values of execute_many to a statement as its SET values, so the statement is compiled
+        # to text with named parameters, which also checks that all columns exist in the table.
+        values = [{'_id': obj_in['id'], **{column: obj_in[column] for column in columns}} for obj_in in objs_in]
+        await database.execute_many(query=str(query), values=values)
+        for obj_in in objs_in:
+            write_to_cache(partial(self._cache_update, obj_in['id'], obj_in))
+
+    async def remove_many(self, ids: List[int]) -> None:
+        """Remove objects with given ids.
+
+        :param ids: ids of objects in database.
+        :return: None
+        """
+        if not ids:
+            return
+        query = self.model.__table__.delete().where(self.model.id.in_(ids))
+        await database.execute(query=query)
+        for id in ids:
+            write_to_cache(partial(self._cache_remove, id))
 
     async def remove(self, id: int) -> int:
         """Remove object with given id.
@@ -80,7 +195,9 @@ class CRUDBase(Generic[ModelType]):
         :return: id of object in database.
         """
         query = self.model.__table__.delete().where(id == self.model.id)
-        return await database.execute(query=query)
+        result = await database.execute(query=query)
+        write_to_cache(partial(self._cache_remove, id))
+        return result
 
     async def remove_all(self) -> int:
         """Remove all rows from table.
@@ -89,3 +206,16 @@ class CRUDBase(Generic[ModelType]):
         """
         query = self.model.__table__.delete()
         return await database.execute(query=query)
+
+    def _cache_put(self, db_obj: dict) -> None:
+        """Apply inserted or updated object to the configuration cache. Models that are not cached do nothing.
+        """
+
+    def _cache_update(self, id: int, obj_in: dict) -> None:
+        """Apply changed attributes of the object with given id to the configuration cache.
+        Models that are not cached do nothing.
+        """
+
+    def _cache_remove(self, id: int) -> None:
+        """Remove object with given id from the configuration cache. Models that are not cached do nothing.
+        """
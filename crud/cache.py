@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional
+
+from crud.instrumentation import database
+from database.models import Channel, Guild
+
+
+class ConfigCache:
+    """In-process cache of guild and channel configuration.
+
+    It is loaded from database at startup and kept coherent by the CRUD modules, which apply every write
+    to the cache right after it succeeds in database, or once the transaction it is part of is committed.
+    While the cache is loaded, CRUD lookups on the hot paths are answered from it. Returned dicts are shared
+    with the cache and must not be modified.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._guilds: Dict[int, dict] = {}
+        self._guild_discord_ids: Dict[int, int] = {}
+        self._guilds_by_hour: Dict[int, Dict[int, dict]] = {}
+        self._channels: Dict[int, dict] = {}
+        self._channel_discord_ids: Dict[int, int] = {}
+        self._channels_by_guild: Dict[int, Dict[int, dict]] = {}
+        self._writes = 0
+
+    async def load(self) -> None:
+        """Load all guilds and channels from database, replacing current content of the cache.
+
+        The new content is built aside and swapped in at once. If the cache is written to while the rows are
+        being fetched, they are fetched again, so writes made during the load are not lost.
+
+        :return: None
+        """
+        while True:
+            writes = self._writes
+            db_guilds = await database.fetch_all(query=Guild.__table__.select())
+            db_channels = await database.fetch_all(query=Channel.__table__.select())
+            if writes == self._writes:
+                break
+        loaded = ConfigCache()
+        for db_guild in db_guilds:
+            loaded.put_guild(dict(db_guild))
+        for db_channel in db_channels:
+            loaded.put_channel(dict(db_channel))
+        self._guilds = loaded._guilds
+        self._guild_discord_ids = loaded._guild_discord_ids
+        self._guilds_by_hour = loaded._guilds_by_hour
+        self._channels = loaded._channels
+        self._channel_discord_ids = loaded._channel_discord_ids
+        self._channels_by_guild = loaded._channels_by_guild
+        self.loaded = True
+
+    def get_guild(self, discord_id: int) -> Optional[dict]:
+        return self._guilds.get(discord_id)
+
+    def get_guild_by_id(self, id: int) -> Optional[dict]:
+        return self._guilds.get(self._guild_discord_ids.get(id))
+
+    def get_guilds_by_hour(self, hour: int) -> List[dict]:
+        return list(self._guilds_by_hour.get(hour, {}).values())
+
+    def get_channel(self, discord_id: int) -> Optional[dict]:
+        return self._channels.get(discord_id)
+
+    def get_channel_by_id(self, id: int) -> Optional[dict]:
+        return self._channels.get(self._channel_discord_ids.get(id))
+
+    def get_channels_by_guild(self, guild_discord_id: int) -> List[dict]:
+        return list(self._channels_by_guild.get(guild_discord_id, {}).values())
+
+    def put_guild(self, db_guild: dict) -> None:
+        """Insert guild into the cache, replacing the cached one with the same id.
+
+        :param db_guild: dict containing all columns of the guild.
+        :return: None
+        """
+        self._writes += 1
+        self._discard_guild(self.get_guild_by_id(db_guild['id']))
+        self._guilds[db_guild['discord_id']] = db_guild
+        self._guild_discord_ids[db_guild['id']] = db_guild['discord_id']
+        self._guilds_by_hour.setdefault(db_guild['time'], {})[db_guild['discord_id']] = db_guild
+
+    def update_guild(self, db_guild: Optional[dict], obj_in: dict) -> None:
+        """Apply changed attributes to the cached guild.
+
+        :param db_guild: Cached guild, nothing is done if it is None.
+        :param obj_in: dict containing changed attributes.
+        :return: None
+        """
+        if db_guild is not None:
+            self.put_guild({**db_guild, **obj_in})
+
+    def remove_guild(self, db_guild: Optional[dict]) -> None:
+        """Remove guild together with its channels from the cache.
+
+        :param db_guild: Cached guild, nothing is done if it is None.
+        :return: None
+        """
+        if db_guild is None:
+            return
+        self._writes += 1
+        self._discard_guild(db_guild)
+        for db_channel in self.get_channels_by_guild(db_guild['discord_id']):
+            self.remove_channel(db_channel)
+
+    def put_channel(self, db_channel: dict) -> None:
+        """Insert channel into the cache, replacing the cached one with the same id.
+
+        :param db_channel: dict containing all columns of the channel.
+        :return: None
+        """
+        self._writes += 1
+        self.remove_channel(self.get_channel_by_id(db_channel['id']))
+        self._channels[db_channel['discord_id']] = db_channel
+        self._channel_discord_ids[db_channel['id']] = db_channel['discord_id']
+        self._channels_by_guild.setdefault(db_channel['guild_discord_id'], {})[db_channel['discord_id']] = db_channel
+
+    def update_channel(self, db_channel: Optional[dict], obj_in: dict) -> None:
+        """Apply changed attributes to the cached channel.
+
+        :param db_channel: Cached channel, nothing is done if it is None.
+        :param obj_in: dict containing changed attributes.
+        :return: None
+        """
+        if db_channel is not None:
+            self.put_channel({**db_channel, **obj_in})
+
+    def remove_channel(self, db_channel: Optional[dict]) -> None:
+        """Remove channel from the cache.
+
+        :param db_channel: Cached channel, nothing is done if it is None.
+        :return: None
+        """
+        if db_channel is None:
+            return
+        self._writes += 1
+        self._channels.pop(db_channel['discord_id'], None)
+        self._channel_discord_ids.pop(db_channel['id'], None)
+        self._channels_by_guild.get(db_channel['guild_discord_id'], {}).pop(db_channel['discord_id'], None)
+
+    def _discard_guild(self, db_guild: Optional[dict]) -> None:
+        if db_guild is None:
+            return
+        self._guilds.pop(db_guild['discord_id'], None)
+        self._guild_discord_ids.pop(db_guild['id'], None)
+        self._guilds_by_hour.get(db_guild['time'], {}).pop(db_guild['discord_id'], None)
+
+
+config_cache = ConfigCache()
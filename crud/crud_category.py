@@ -1,11 +1,12 @@
-from typing import Tuple, Union
+from typing import List, Tuple, Union
 
 import discord
+from asyncpg import Record
 
 import crud
 from crud.base import CRUDBase
+from crud.instrumentation import database
 from database.models import Category
-from database.session import database
 
 
 class CRUDCategory(CRUDBase[Category]):
@@ -18,6 +19,15 @@ class CRUDCategory(CRUDBase[Category]):
         query = self.model.__table__.select().where(self.model.guild_id == guild_id)
         return await database.fetch_one(query=query)
 
+    async def get_all_by_guild_id(self, guild_id: int) -> List[Record]:
+        """Get all categories of the Guild in database.
+
+        :param guild_id: id of Guild in database.
+        :return: List of Record objects containing data.
+        """
+        query = self.model.__table__.select().where(self.model.guild_id == guild_id)
+        return await database.fetch_all(query=query)
+
     async def create_with_relationship(self,
                                        category_in: discord.CategoryChannel,
                                        guild_in: Union[discord.Guild, int]) -> Tuple[int, int]:
@@ -1,12 +1,14 @@
 from typing import List, Union
 
 import discord
+from asyncpg import Record
 
 import crud
 import settings
-from crud.base import CRUDBase
+from crud.base import CRUDBase, transaction, write_to_cache
+from crud.cache import config_cache
+from crud.instrumentation import database
 from database.models import Channel
-from database.session import database
 
 
 class CRUDChannel(CRUDBase[Channel]):
@@ -19,12 +21,24 @@ class CRUDChannel(CRUDBase[Channel]):
         query = self.model.__table__.select().where(self.model.guild_id == guild_id)
         return await database.fetch_all(query=query)
 
+    async def get_by_discord_id(self, discord_id: int) -> Record:
+        """Return single record from given object discord ID, served from the configuration cache when it is loaded.
+
+        :param discord_id: Database object discord_id.
+        :return: Record object containing data.
+        """
+        if config_cache.loaded:
+            return config_cache.get_channel(discord_id)
+        return await super().get_by_discord_id(discord_id)
+
     async def get_all_by_guild_discord_id(self, guild_discord_id: int) -> int:
-        """Get all channels by id of the Guild in Discord.
+        """Get all channels by id of the Guild in Discord, served from the configuration cache when it is loaded.
 
         :param guild_discord_id: id of Guild in Discord.
         :return: List of Records objects containing data.
         """
+        if config_cache.loaded:
+            return config_cache.get_channels_by_guild(guild_discord_id)
         query = self.model.__table__.select().where(self.model.guild_discord_id == guild_discord_id)
         return await database.fetch_all(query=query)
 
@@ -37,70 +51,56 @@ class CRUDChannel(CRUDBase[Channel]):
         query = self.model.__table__.select().where(self.model.category_id == category_id)
         return await database.fetch_all(query=query)
 
-    async def create(self, obj_in: discord.TextChannel) -> int:
-        """Create record in database from discord.TextChannel class object.
-
-        :param obj_in: discord.TextChannel object.
-        :return: id of created object.
-        """
-        guild_dict = {
-            'discord_id': obj_in.id,
-            'name': obj_in.name
-        }
-        query = self.model.__table__.insert().values(**guild_dict)
-        return await database.execute(query=query)
-
     async def bulk_create(self,
                           channels_in: List[discord.TextChannel],
                           category_in: Union[discord.CategoryChannel, int],
-                          guild_in: Union[discord.Guild, int]) -> None:
-        """Create multiple records in database from discord.TextChannel class objects.
-        It requires proving a category and guild to create relationships.
+                          guild_in: Union[discord.Guild, int]) -> List[Record]:
+        """Create or update multiple records in database from discord.TextChannel class objects.
+        It requires proving a category and guild to create relationships. Guild and category given as discord.py
+        objects are created or updated as well. Everything happens in a single transaction, so running it again
+        for the same guild is safe.
 
         :param channels_in: List of discord.TextChannel object.
         :param category_in: discord.CategoryChannel object or ID of category in database.
         :param guild_in: discord.Guild object or ID of guild in database.
-        :return: None.
-        """
-        if type(category_in) == discord.CategoryChannel:
-            db_category = await crud.category.get_by_discord_id(category_in.id)
-        else:
-            db_category = await crud.category.get(category_in)
-        if not db_category:
-            db_guild_id, db_category_id = await crud.category.create_with_relationship(category_in, guild_in)
-            db_category = await crud.category.get(db_category_id)
-        else:
-            db_guild_id = db_category['guild_id']
-            db_category_id = db_category['id']
-        db_guild = await crud.guild.get(db_guild_id)
-        channels_list = []
-        for channel_in in channels_in:
-            channel_dict = {
-                'discord_id': channel_in.id,
-                'name': channel_in.name,
-                'category_id': db_category_id,
-                'guild_id': db_guild_id,
-                'category_discord_id': db_category['discord_id'],
-                'guild_discord_id': db_guild['discord_id'],
-                'min_retail_price': settings.CHANNELS_SETTINGS[channel_in.name]['min_retail_price'],
-                'max_retail_price': settings.CHANNELS_SETTINGS[channel_in.name]['max_retail_price'],
-                'store': settings.CHANNELS_SETTINGS[channel_in.name]['store'],
-            }
-            channels_list.append(channel_dict)
-        query = self.model.__table__.insert().values(channels_list)
-        await database.execute(query=query)
-
-    async def update_by_name(self, name: str, obj_in: dict) -> int:
-        """Update object with given name.
-
-        :param name: name of updated Channel in database.
-        :param obj_in: dict containing required attributes.
-        :return: id of updated object in database.
+        :return: List of Records objects containing data of the channels.
         """
-        query = (
-            self.model.__table__.update().where(name == self.model.name).values(**obj_in)
-        )
-        return await database.execute(query=query)
+        async with transaction():
+            if isinstance(guild_in, discord.Guild):
+                db_guilds = await crud.guild.upsert_many([{'discord_id': guild_in.id,
+                                                           'name': guild_in.name,
+                                                           'auto': True,
+                                                           'time': 12,
+                                                           'missing_since': None}],
+                                                         index_elements=['discord_id'],
+                                                         update_columns=['name', 'missing_since'])
+                db_guild = db_guilds[0]
+            else:
+                db_guild = await crud.guild.get(guild_in)
+            if isinstance(category_in, discord.CategoryChannel):
+                db_categories = await crud.category.upsert_many([{'discord_id': category_in.id,
+                                                                  'name': category_in.name,
+                                                                  'guild_id': db_guild['id'],
+                                                                  'guild_discord_id': db_guild['discord_id']}],
+                                                                index_elements=['discord_id'])
+                db_category = db_categories[0]
+            else:
+                db_category = await crud.category.get(category_in)
+            channels_list = []
+            for channel_in in channels_in:
+                channel_dict = {
+                    'discord_id': channel_in.id,
+                    'name': channel_in.name,
+                    'category_id': db_category['id'],
+                    'guild_id': db_guild['id'],
+                    'category_discord_id': db_category['discord_id'],
+                    'guild_discord_id': db_guild['discord_id'],
+                    'min_retail_price': settings.CHANNELS_SETTINGS[channel_in.name]['min_retail_price'],
+                    'max_retail_price': settings.CHANNELS_SETTINGS[channel_in.name]['max_retail_price'],
+                    'store': settings.CHANNELS_SETTINGS[channel_in.name]['store'],
+                }
+                channels_list.append(channel_dict)
+            return await self.upsert_many(channels_list, index_elements=['discord_id'])
 
     async def update_by_discord_id(self, discord_id: int, obj_in: dict) -> int:
         """Update object with given id.
@@ -112,7 +112,18 @@ class CRUDChannel(CRUDBase[Channel]):
         query = (
             self.model.__table__.update().where(discord_id == self.model.discord_id).values(**obj_in)
         )
-        return await database.execute(query=query)
+        result = await database.execute(query=query)
+        write_to_cache(lambda: config_cache.update_channel(config_cache.get_channel(discord_id), obj_in))
+        return result
+
+    def _cache_put(self, db_obj: dict) -> None:
+        config_cache.put_channel(db_obj)
+
+    def _cache_update(self, id: int, obj_in: dict) -> None:
+        config_cache.update_channel(config_cache.get_channel_by_id(id), obj_in)
+
+    def _cache_remove(self, id: int) -> None:
+        config_cache.remove_channel(config_cache.get_channel_by_id(id))
 
 
 channel = CRUDChannel(Channel)
@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import List
+
+from asyncpg import Record
+from sqlalchemy import Integer, cast, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+
+from crud.base import CRUDBase
+from crud.instrumentation import database
+from database.models import Deal, Snapshot
+
+
+class CRUDDeal(CRUDBase[Deal]):
+    # Columns stored deals are ordered by for sorting criteria of the API. Other criteria keep the order
+    # the deals have been fetched in.
+    SORT_COLUMNS = {
+        'Title': Deal.title,
+        'Savings': Deal.saved_percentage.desc(),
+        'Price': Deal.sale_price,
+        'Metacritic': cast(Deal.metacritic_score, Integer).desc().nullslast(),
+        'Reviews': cast(Deal.steam_reviews_percent, Integer).desc().nullslast()
+    }
+
+    async def get_latest_snapshot(self) -> Record:
+        """Return the most recent snapshot of deals.
+
+        :return: Record object containing data.
+        """
+        query = Snapshot.__table__.select().order_by(Snapshot.id.desc()).limit(1)
+        return await database.fetch_one(query=query)
+
+    async def create_snapshot(self, deals_in: List[dict]) -> int:
+        """Create new snapshot and upsert given deals into it, in a single transaction.
+        Deals are matched by their deal ID and store ID, deals that are new keep the snapshot as the one they first
+        appeared in.
+
+        :param deals_in: List of dicts containing deal attributes, in the order they should be served in.
+        :return: id of created snapshot.
+        """
+        unique_deals = {}
+        for deal_in in deals_in:
+            unique_deals.setdefault((deal_in['deal_id'], deal_in['store_id']), deal_in)
+        async with database.transaction():
+            snapshot_query = Snapshot.__table__.insert().values(created_at=datetime.now(),
+                                                                deals_count=len(unique_deals))
+            snapshot_id = await database.execute(query=snapshot_query)
+            if not unique_deals:
+                return snapshot_id
+            deals_list = [{**deal_in,
+                           'position': position,
+                           'snapshot_id': snapshot_id,
+                           'first_snapshot_id': snapshot_id} for position, deal_in in enumerate(unique_deals.values())]
+            query = insert(self.model.__table__).values(deals_list)
+            query = query.on_conflict_do_update(
+                index_elements=[self.model.deal_id, self.model.store_id],
+                set_={column: query.excluded[column] for column in deals_list[0].keys()
+                      if column not in ('deal_id', 'store_id', 'first_snapshot_id')}
+            )
+            await database.execute(query=query)
+        return snapshot_id
+
+    async def remove_snapshots_older_than(self, before: datetime) -> None:
+        """Remove snapshots created before given time, together with deals which have not appeared in any newer
+        snapshot, in a single transaction. The most recent snapshot is always kept.
+
+        :param before: Creation time of the oldest kept snapshot.
+        :return: None
+        """
+        latest_snapshot_id = select([func.max(Snapshot.id)]).as_scalar()
+        old_snapshot_ids = (
+            select([Snapshot.id])
+            .where(Snapshot.created_at < before)
+            .where(Snapshot.id < latest_snapshot_id)
+        )
+        async with database.transaction():
+            query = self.model.__table__.delete().where(or_(self.model.snapshot_id.in_(old_snapshot_ids),
+                                                            self.model.snapshot_id.is_(None)))
+            await database.execute(query=query)
+            query = Snapshot.__table__.delete().where(Snapshot.id.in_(old_snapshot_ids))
+            await database.execute(query=query)
+
+    async def get_all_by_filters(self, *,
+                                 store_ids: List[str],
+                                 amount: int,
+                                 sort_by: str = None,
+                                 min_price: int = None,
+                                 max_price: int = None,
+                                 min_steam_rating: int = None,
+                                 aaa: bool = False) -> List[Record]:
+        """Return deals from the most recent snapshot which match given filters, sorted like the API would
+        sort them, or in the order they have been fetched.
+
+        :param store_ids: IDs of the stores used by the API.
+        :param amount: Maximum amount of returned deals.
+        :param sort_by: Sorting criteria of the API, one of the keys of SORT_COLUMNS.
+        :param min_price: Minimum discount price of the deals.
+        :param max_price: Maximum discount price of the deals.
+        :param min_steam_rating: Minimum steam rating of the deals.
+        :param aaa: If True, returns only deals with retail price more than 29$.
+        :return: List of Record objects containing data.
+        """
+        latest_snapshot_id = select([func.max(Snapshot.id)]).as_scalar()
+        query = self.model.__table__.select().where(self.model.snapshot_id == latest_snapshot_id)
+        query = query.where(self.model.store_id.in_(store_ids))
+        if min_price:
+            query = query.where(self.model.sale_price >= min_price)
+        if max_price is not None:
+            query = query.where(self.model.sale_price <= max_price)
+        if min_steam_rating:
+            query = query.where(cast(self.model.steam_reviews_percent, Integer) >= min_steam_rating)
+        if aaa:
+            query = query.where(self.model.normal_price > 29)
+        if sort_by in self.SORT_COLUMNS:
+            query = query.order_by(self.SORT_COLUMNS[sort_by])
+        query = query.order_by(self.model.position).limit(amount)
+        return await database.fetch_all(query=query)
+
+
+deal = CRUDDeal(Deal)
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import List, Optional
+
+from asyncpg import Record
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.postgresql import insert
+
+from crud.base import CRUDBase
+from crud.instrumentation import database
+from database.migrations import DELIVERY_LEDGER_VERSION
+from database.models import Delivery
+
+PENDING = 'pending'
+DELIVERED = 'delivered'
+FAILED = 'failed'
+
+
+class CRUDDelivery(CRUDBase[Delivery]):
+    async def get_started_at(self) -> Optional[datetime]:
+        """Return the time the delivery ledger has been introduced to the database at, by the clock of this process.
+
+        The migration is timestamped by the database, whose time zone may differ from the one of this process,
+        so only the time elapsed since then is read from database.
+
+        :return: Time the delivery ledger migration has been applied at, None if it has not been applied.
+        """
+        query = text('SELECT LOCALTIMESTAMP - applied_at FROM schema_version WHERE version = :version')
+        elapsed = await database.fetch_val(query=query, values={'version': DELIVERY_LEDGER_VERSION})
+        if elapsed is None:
+            return None
+        return datetime.now() - elapsed
+
+    async def get_all_settled_since(self, since: datetime, max_attempts: int) -> List[Record]:
+        """Get deliveries scheduled after given time that must not be attempted again,
+        because they have either succeeded or run out of attempts.
+
+        :param since: Earliest scheduled time of returned deliveries.
+        :param max_attempts: Maximum amount of attempts of a single delivery.
+        :return: List of Records objects containing data.
+        """
+        query = (
+            self.model.__table__.select()
+            .where(self.model.scheduled_for > since)
+            .where(or_(self.model.status == DELIVERED, self.model.attempts >= max_attempts))
+        )
+        return await database.fetch_all(query=query)
+
+    async def start(self, guild_id: int, scheduled_for: datetime) -> None:
+        """Record new attempt of the delivery to the Guild, creating the delivery if it does not exist.
+
+        :param guild_id: id of Guild in database.
+        :param scheduled_for: Time the delivery has been scheduled for.
+        :return: None
+        """
+        query = insert(self.model.__table__).values(guild_id=guild_id,
+                                                    scheduled_for=scheduled_for,
+                                                    status=PENDING,
+                                                    attempts=1,
+                                                    updated_at=datetime.now())
+        query = query.on_conflict_do_update(
+            index_elements=[self.model.guild_id, self.model.scheduled_for],
+            set_={'status': PENDING,
+                  'attempts': self.model.attempts + 1,
+                  'updated_at': query.excluded.updated_at}
+        )
+        await database.execute(query=query)
+
+    async def finish(self, guild_id: int, scheduled_for: datetime, delivered: bool) -> None:
+        """Record result of the delivery to the Guild, creating the delivery if it does not exist.
+
+        :param guild_id: id of Guild in database.
+        :param scheduled_for: Time the delivery has been scheduled for.
+        :param delivered: True if deals have been delivered, False if the attempt has failed.
+        :return: None
+        """
+        query = insert(self.model.__table__).values(guild_id=guild_id,
+                                                    scheduled_for=scheduled_for,
+                                                    status=DELIVERED if delivered else FAILED,
+                                                    attempts=1,
+                                                    updated_at=datetime.now())
+        query = query.on_conflict_do_update(
+            index_elements=[self.model.guild_id, self.model.scheduled_for],
+            set_={'status': query.excluded.status,
+                  'updated_at': query.excluded.updated_at}
+        )
+        await database.execute(query=query)
+
+    async def remove_older_than(self, before: datetime) -> int:
+        """Remove deliveries scheduled before given time.
+
+        :param before: Scheduled time of the oldest kept delivery.
+        :return: id of object in database.
+        """
+        query = self.model.__table__.delete().where(self.model.scheduled_for < before)
+        return await database.execute(query=query)
+
+
+delivery = CRUDDelivery(Delivery)
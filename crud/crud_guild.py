@@ -1,24 +1,83 @@
-from typing import List
+from datetime import datetime
+from functools import partial
+from typing import Dict, List
 
 import discord
 from asyncpg import Record
+from sqlalchemy import and_, select
 
-from crud.base import CRUDBase
-from database.models import Guild
-from database.session import database
+from crud.base import CRUDBase, write_to_cache
+from crud.cache import config_cache
+from crud.instrumentation import database
+from database.models import Channel, Guild
 
 
 class CRUDGuild(CRUDBase[Guild]):
+    async def get_by_discord_id(self, discord_id: int) -> Record:
+        """Return single record from given object discord ID, served from the configuration cache when it is loaded.
+
+        :param discord_id: Database object discord_id.
+        :return: Record object containing data.
+        """
+        if config_cache.loaded:
+            return config_cache.get_guild(discord_id)
+        return await super().get_by_discord_id(discord_id)
+
     async def get_all_by_filters(self, *,
                                  time: int,
                                  auto: bool) -> List[Record]:
-        """Return all Guilds which match given filters.
+        """Return all Guilds which match given filters, served from the configuration cache when it is loaded.
 
         :param time Hour of the sending deals task execution.
         :param auto If the guild has auto sending enabled.
         :return: List of Record objects containing data.
         """
-        query = self.model.__table__.select().where(time == self.model.time and auto == self.model.auto)
+        if config_cache.loaded:
+            return [db_guild for db_guild in config_cache.get_guilds_by_hour(time) if db_guild['auto'] == auto]
+        query = self.model.__table__.select().where(and_(self.model.time == time, self.model.auto == auto))
+        return await database.fetch_all(query=query)
+
+    async def get_all_due_with_channels(self, time: int) -> List[dict]:
+        """Return all Guilds with auto sending enabled for given hour, that are not missing, together with their channels,
+        using a single joined query. Served from the configuration cache when it is loaded.
+
+        :param time: Hour of the sending deals task execution.
+        :return: List of dicts containing data of the Guilds, each with list of its channels under 'channels' key.
+        """
+        if config_cache.loaded:
+            return [{**db_guild, 'channels': config_cache.get_channels_by_guild(db_guild['discord_id'])}
+                    for db_guild in config_cache.get_guilds_by_hour(time)
+                    if db_guild['auto'] and not db_guild['missing_since']]
+
+        guild_table = self.model.__table__
+        channel_table = Channel.__table__
+        query = (
+            select([guild_table, channel_table])
+            .select_from(guild_table.outerjoin(channel_table, channel_table.c.guild_id == guild_table.c.id))
+            .where(and_(guild_table.c.time == time,
+                        guild_table.c.auto.is_(True),
+                        guild_table.c.missing_since.is_(None)))
+            .apply_labels()
+        )
+        db_guilds: Dict[int, dict] = {}
+        for row in await database.fetch_all(query=query):
+            guild_id = row[f'{guild_table.name}_id']
+            if guild_id not in db_guilds:
+                db_guilds[guild_id] = {column: row[f'{guild_table.name}_{column}']
+                                       for column in guild_table.columns.keys()}
+                db_guilds[guild_id]['channels'] = []
+            if row[f'{channel_table.name}_id'] is not None:
+                db_guilds[guild_id]['channels'].append({column: row[f'{channel_table.name}_{column}']
+                                                        for column in channel_table.columns.keys()})
+        return list(db_guilds.values())
+
+    async def get_all_missing_before(self, before: datetime) -> List[Record]:
+        """Return all Guilds that have been marked as missing before given time.
+
+        :param before: Time the oldest kept missing Guild has been marked at.
+        :return: List of Record objects containing data.
+        """
+        query = self.model.__table__.select().where(self.model.missing_since < before)
         return await database.fetch_all(query=query)
 
     async def create(self, obj_in: discord.Guild) -> int:
@@ -31,10 +90,13 @@ class CRUDGuild(CRUDBase[Guild]):
             'discord_id': obj_in.id,
             'name': obj_in.name,
             'auto': True,
-            'time': 12
+            'time': 12,
+            'missing_since': None
         }
         query = self.model.__table__.insert().values(**guild_dict)
-        return await database.execute(query=query)
+        id = await database.execute(query=query)
+        write_to_cache(partial(self._cache_put, {'id': id, **guild_dict}))
+        return id
 
     async def update_by_discord_id(self, discord_id: int, obj_in: dict) -> int:
         """Update object with given id.
@@ -46,7 +108,9 @@ class CRUDGuild(CRUDBase[Guild]):
         query = (
             self.model.__table__.update().where(discord_id == self.model.discord_id).values(**obj_in)
         )
-        return await database.execute(query=query)
+        result = await database.execute(query=query)
+        write_to_cache(lambda: config_cache.update_guild(config_cache.get_guild(discord_id), obj_in))
+        return result
 
     async def remove_by_discord_id(self, discord_id: int) -> int:
         """Remove Guild with given discord ID.
@@ -55,7 +119,18 @@ class CRUDGuild(CRUDBase[Guild]):
         :return: id of object in database.
         """
         query = self.model.__table__.delete().where(discord_id == self.model.discord_id)
-        return await database.execute(query=query)
+        result = await database.execute(query=query)
+        write_to_cache(lambda: config_cache.remove_guild(config_cache.get_guild(discord_id)))
+        return result
+
+    def _cache_put(self, db_obj: dict) -> None:
+        config_cache.put_guild(db_obj)
+
+    def _cache_update(self, id: int, obj_in: dict) -> None:
+        config_cache.update_guild(config_cache.get_guild_by_id(id), obj_in)
+
+    def _cache_remove(self, id: int) -> None:
+        config_cache.remove_guild(config_cache.get_guild_by_id(id))
 
 
 guild = CRUDGuild(Guild)
@@ -0,0 +1,63 @@
+from typing import List
+
+from asyncpg import Record
+
+from crud.base import CRUDBase
+from crud.instrumentation import database
+from database.models import Message
+
+
+class CRUDMessage(CRUDBase[Message]):
+    async def get_all_by_channel_id(self, channel_id: int) -> List[Record]:
+        """Get all messages posted by the bot in the Channel, ordered by their position in the channel.
+
+        :param channel_id: id of Channel in database.
+        :return: List of Records objects containing data.
+        """
+        query = (
+            self.model.__table__.select().where(self.model.channel_id == channel_id).order_by(self.model.position)
+        )
+        return await database.fetch_all(query=query)
+
+    async def bulk_create(self, messages_in: List[dict]) -> None:
+        """Create multiple records in database.
+
+        :param messages_in: List of dicts containing required attributes.
+        :return: None.
+        """
+        if not messages_in:
+            return
+        query = self.model.__table__.insert().values(messages_in)
+        await database.execute(query=query)
+
+    async def remove_by_discord_ids(self, discord_ids: List[int]) -> int:
+        """Remove messages with given discord IDs.
+
+        :param discord_ids: IDs of Messages in Discord.
+        :return: id of object in database.
+        """
+        query = self.model.__table__.delete().where(self.model.discord_id.in_(discord_ids))
+        return await database.execute(query=query)
+
+    async def remove_by_channel_id(self, channel_id: int) -> int:
+        """Remove all messages of the Channel.
+
+        :param channel_id: id of Channel in database.
+        :return: id of object in database.
+        """
+        query = self.model.__table__.delete().where(self.model.channel_id == channel_id)
+        return await database.execute(query=query)
+
+    async def remove_by_channel_ids(self, channel_ids: List[int]) -> None:
+        """Remove all messages of the Channels.
+
+        :param channel_ids: ids of Channels in database.
+        :return: None
+        """
+        if not channel_ids:
+            return
+        query = self.model.__table__.delete().where(self.model.channel_id.in_(channel_ids))
+        await database.execute(query=query)
+
+
+message = CRUDMessage(Message)
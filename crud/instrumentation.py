@@ -0,0 +1,151 @@
+import logging
+import time
+from bisect import bisect_left
+from typing import Dict, List, Union
+
+from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.util import find_tables
+
+import settings
+from database.session import database as _database
+
+# Upper bounds of the latency histogram buckets, in milliseconds. The last bucket is unbounded.
+BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def query_label(query: Union[ClauseElement, str]) -> str:
+    """Function that describes a query by its statement type and table, for example 'select guild'.
+
+    :param query: SQLAlchemy query or raw SQL string.
+    :return: Label of the query.
+    """
+    if isinstance(query, str):
+        return ' '.join(query.split()[:2]).lower()
+    table = getattr(query, 'table', None)
+    if table is not None:
+        tables = [table.name]
+    else:
+        tables = sorted(table.name for from_clause in getattr(query, 'froms', []) for table in find_tables(from_clause))
+    return f"{query.__visit_name__} {','.join(tables)}"
+
+
+class QueryHistogram:
+    """A class to represent latency distribution of a single kind of query.
+
+    Attributes
+    ----------
+    counts : List[int]
+        amount of queries in each bucket from BUCKETS, plus one unbounded bucket at the end
+    count : int
+        total amount of queries
+    total_ms : float
+        total time spent on the queries, in milliseconds
+    max_ms : float
+        longest query time, in milliseconds
+    """
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float) -> None:
+        self.counts[bisect_left(BUCKETS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, percent: float) -> float:
+        """Return upper bound of the bucket that contains given percentile, in milliseconds.
+        Returns infinity if it is in the unbounded bucket.
+        """
+        threshold = self.count * percent / 100
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return bound
+        return float('inf')
+
+    def __str__(self) -> str:
+        average = self.total_ms / self.count if self.count else 0.0
+        return (f'count={self.count} avg={average:.1f}ms p50<={self.percentile(50)}ms '
+                f'p95<={self.percentile(95)}ms p99<={self.percentile(99)}ms max={self.max_ms:.1f}ms')
+
+
+class InstrumentedDatabase:
+    """Wrapper of the databases.Database object used by the CRUD modules, that measures every query.
+
+    Latencies are collected in a histogram per query label, and queries slower than settings.DB_SLOW_QUERY_MS
+    are logged as warnings.
+    """
+
+    def __init__(self, database):
+        self._database = database
+        self.histograms: Dict[str, QueryHistogram] = {}
+
+    def transaction(self):
+        return self._database.transaction()
+
+    async def fetch_one(self, query: Union[ClauseElement, str], values: dict = None):
+        started_at = time.perf_counter()
+        try:
+            return await self._database.fetch_one(query=query, values=values)
+        finally:
+            self._observe(query, started_at)
+
+    async def fetch_all(self, query: Union[ClauseElement, str], values: dict = None):
+        started_at = time.perf_counter()
+        try:
+            return await self._database.fetch_all(query=query, values=values)
+        finally:
+            self._observe(query, started_at)
+
+    async def fetch_val(self, query: Union[ClauseElement, str], values: dict = None):
+        started_at = time.perf_counter()
+        try:
+            return await self._database.fetch_val(query=query, values=values)
+        finally:
+            self._observe(query, started_at)
+
+    async def execute(self, query: Union[ClauseElement, str], values: dict = None):
+        started_at = time.perf_counter()
+        try:
+            return await self._database.execute(query=query, values=values)
+        finally:
+            self._observe(query, started_at)
+
+    async def execute_many(self, query: Union[ClauseElement, str], values: List[dict]):
+        started_at = time.perf_counter()
+        try:
+            return await self._database.execute_many(query=query, values=values)
+        finally:
+            self._observe(query, started_at)
+
+    def report(self, reset: bool = True) -> List[str]:
+        """Return summary of the collected latencies, one line per query label, slowest on average first.
+
+        :param reset: If True, collected latencies are cleared afterwards.
+        :return: List of summary lines.
+        """
+        histograms = sorted(self.histograms.items(),
+                            key=lambda item: item[1].total_ms / item[1].count,
+                            reverse=True)
+        lines = [f'{label}: {histogram}' for label, histogram in histograms]
+        if reset:
+            self.histograms = {}
+        return lines
+
+    def _observe(self, query: Union[ClauseElement, str], started_at: float) -> None:
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        label = query_label(query)
+        histogram = self.histograms.get(label)
+        if histogram is None:
+            histogram = self.histograms[label] = QueryHistogram()
+        histogram.observe(elapsed_ms)
+        if elapsed_ms >= settings.DB_SLOW_QUERY_MS:
+            logging.warning(f'Slow query ({elapsed_ms:.1f}ms): {label}')
+
+
+database = InstrumentedDatabase(_database)
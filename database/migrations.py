@@ -0,0 +1,81 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from database.models import Base
+
+# Key of the Postgres advisory lock held while migrating, any number that is not used by other locks.
+MIGRATIONS_LOCK_ID = 823740152
+DELIVERY_LEDGER_VERSION = 3
+
+# Ordered list of schema migrations as (version, name, statements). Applied versions are recorded
+# in the schema_version table, so each migration runs exactly once. Append new migrations at the end.
+MIGRATIONS = [
+    (1, 'guild_time_auto_index', [
+        'CREATE INDEX IF NOT EXISTS ix_guild_time_auto ON guild (time, auto)'
+    ]),
+    (2, 'lookup_columns_indexes', [
+        'CREATE INDEX IF NOT EXISTS ix_guild_name ON guild (name)',
+        'CREATE INDEX IF NOT EXISTS ix_category_guild_id ON category (guild_id)',
+        'CREATE INDEX IF NOT EXISTS ix_channel_guild_id ON channel (guild_id)',
+        'CREATE INDEX IF NOT EXISTS ix_channel_guild_discord_id ON channel (guild_discord_id)',
+        'CREATE INDEX IF NOT EXISTS ix_channel_category_id ON channel (category_id)',
+        'CREATE INDEX IF NOT EXISTS ix_channel_name ON channel (name)',
+        'CREATE INDEX IF NOT EXISTS ix_message_channel_id ON message (channel_id)',
+        'CREATE INDEX IF NOT EXISTS ix_deal_snapshot_id ON deal (snapshot_id)',
+        'CREATE INDEX IF NOT EXISTS ix_deal_first_snapshot_id ON deal (first_snapshot_id)'
+    ]),
+    # Time this migration is applied at marks the start of the delivery ledger, deliveries scheduled before it
+    # are not caught up.
+    (DELIVERY_LEDGER_VERSION, 'delivery_ledger', [
+        'CREATE INDEX IF NOT EXISTS ix_delivery_scheduled_for ON delivery (scheduled_for)'
+    ]),
+    (4, 'guild_missing_since', [
+        'ALTER TABLE guild ADD COLUMN IF NOT EXISTS missing_since TIMESTAMP'
+    ]),
+]
+
+
+def migrate(engine: Engine) -> None:
+    """Create missing tables and apply pending migrations, then release connections of the engine.
+
+    This uses a synchronous engine, so it is meant to be called once at startup, before the event loop starts.
+    Everything happens under a Postgres advisory lock, so bot processes started at the same time
+    (e.g. one per group of shards) migrate one after another instead of racing each other.
+
+    :param engine: Synchronous SQLAlchemy engine.
+    :return: None
+    """
+    with engine.connect() as lock_connection:
+        lock_connection.execute(text('SELECT pg_advisory_lock(:lock_id)'), lock_id=MIGRATIONS_LOCK_ID)
+        try:
+            Base.metadata.create_all(engine)
+            run_migrations(engine)
+        finally:
+            lock_connection.execute(text('SELECT pg_advisory_unlock(:lock_id)'), lock_id=MIGRATIONS_LOCK_ID)
+    engine.dispose()
+
+
+def run_migrations(engine: Engine) -> None:
+    """Apply all migrations that have not been applied to the database yet, each in its own transaction.
+
+    :param engine: Synchronous SQLAlchemy engine.
+    :return: None
+    """
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE IF NOT EXISTS schema_version ('
+                                'version INTEGER PRIMARY KEY, '
+                                'name VARCHAR(100), '
+                                'applied_at TIMESTAMP DEFAULT now())'))
+        applied_versions = {row[0] for row in connection.execute(text('SELECT version FROM schema_version'))}
+
+    for version, name, statements in MIGRATIONS:
+        if version in applied_versions:
+            continue
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.execute(text('INSERT INTO schema_version (version, name) VALUES (:version, :name)'),
+                               version=version, name=name)
+        logging.info(f'Applied database migration {version}: {name}')
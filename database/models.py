@@ -1,23 +1,26 @@
-from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from database.base import Base
 
 
 class Guild(Base):
+    __table_args__ = (Index('ix_guild_time_auto', 'time', 'auto'),)
+
     id = Column('id', Integer, primary_key=True)
     discord_id = Column('discord_id', BigInteger, unique=True)
     category = relationship('Category', uselist=False, back_populates='guild', cascade="all,delete")
     channels = relationship('Channel', cascade="all,delete")
-    name = Column('name', String(length=100))
+    name = Column('name', String(length=100), index=True)
     auto = Column('auto', Boolean)
     time = Column('time', Integer)
+    missing_since = Column(DateTime)
 
 
 class Category(Base):
     id = Column('id', Integer, primary_key=True)
     discord_id = Column('discord_id', BigInteger, unique=True)
-    guild_id = Column(Integer, ForeignKey('guild.id', ondelete='CASCADE'))
+    guild_id = Column(Integer, ForeignKey('guild.id', ondelete='CASCADE'), index=True)
     guild_discord_id = Column(BigInteger, ForeignKey('guild.discord_id', ondelete='CASCADE'))
     name = Column('name', String(length=100))
     guild = relationship("Guild", back_populates='category', cascade="all,delete")
@@ -27,11 +30,57 @@ class Category(Base):
 class Channel(Base):
     id = Column('id', Integer, primary_key=True)
     discord_id = Column('discord_id', BigInteger, unique=True)
-    guild_id = Column(Integer, ForeignKey('guild.id', ondelete='CASCADE'))
-    guild_discord_id = Column(BigInteger, ForeignKey('guild.discord_id', ondelete='CASCADE'))
-    category_id = Column(Integer, ForeignKey('category.id', ondelete='CASCADE'))
+    guild_id = Column(Integer, ForeignKey('guild.id', ondelete='CASCADE'), index=True)
+    guild_discord_id = Column(BigInteger, ForeignKey('guild.discord_id', ondelete='CASCADE'), index=True)
+    category_id = Column(Integer, ForeignKey('category.id', ondelete='CASCADE'), index=True)
     category_discord_id = Column(BigInteger, ForeignKey('category.discord_id', ondelete='CASCADE'))
-    name = Column('name', String(length=100))
+    name = Column('name', String(length=100), index=True)
     min_retail_price = Column(Integer)
     max_retail_price = Column(Integer)
     store = Column(String(length=20))
+    messages = relationship('Message', cascade="all,delete")
+
+
+class Message(Base):
+    id = Column('id', Integer, primary_key=True)
+    discord_id = Column('discord_id', BigInteger, unique=True)
+    channel_id = Column(Integer, ForeignKey('channel.id', ondelete='CASCADE'), index=True)
+    position = Column(Integer)
+    digest = Column(String(length=40))
+
+
+class Delivery(Base):
+    __table_args__ = (UniqueConstraint('guild_id', 'scheduled_for'),)
+
+    id = Column('id', Integer, primary_key=True)
+    guild_id = Column(Integer, ForeignKey('guild.id', ondelete='CASCADE'))
+    scheduled_for = Column(DateTime, index=True)
+    status = Column(String(length=20))
+    attempts = Column(Integer)
+    updated_at = Column(DateTime)
+
+
+class Snapshot(Base):
+    id = Column('id', Integer, primary_key=True)
+    created_at = Column(DateTime)
+    deals_count = Column(Integer)
+
+
+class Deal(Base):
+    __table_args__ = (UniqueConstraint('deal_id', 'store_id'),)
+
+    id = Column('id', Integer, primary_key=True)
+    deal_id = Column(String(length=100))
+    store_id = Column(String(length=10))
+    title = Column('title', String(length=200))
+    sale_price = Column(Float)
+    normal_price = Column(Float)
+    saved_percentage = Column(Integer)
+    metacritic_score = Column(String(length=10))
+    steam_reviews_percent = Column(String(length=10))
+    steam_reviews_count = Column(String(length=20))
+    steam_app_id = Column(String(length=20))
+    thumbnail_url = Column(String(length=500))
+    position = Column(Integer)
+    first_snapshot_id = Column(Integer, ForeignKey('snapshot.id', ondelete='SET NULL'), index=True)
+    snapshot_id = Column(Integer, ForeignKey('snapshot.id', ondelete='SET NULL'), index=True)
@@ -1,7 +1,14 @@
 import databases
 import sqlalchemy
+from sqlalchemy.pool import NullPool
 
 import settings
 
-engine = sqlalchemy.create_engine(settings.DATABASE_URL)
-database = databases.Database(url=settings.DATABASE_URL, ssl='allow')
+# Synchronous engine is only used to run migrations at startup, so it does not keep any connections open.
+engine = sqlalchemy.create_engine(settings.DATABASE_URL, poolclass=NullPool)
+database = databases.Database(url=settings.DATABASE_URL,
+                              ssl='allow',
+                              min_size=settings.DB_POOL_MIN_SIZE,
+                              max_size=settings.DB_POOL_MAX_SIZE,
+                              command_timeout=settings.DB_COMMAND_TIMEOUT,
+                              server_settings={'statement_timeout': str(settings.DB_STATEMENT_TIMEOUT)})
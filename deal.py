@@ -1,11 +1,22 @@
+import asyncio
+import logging
 import random
-from dataclasses import dataclass
-from typing import List
+import time
+from bisect import bisect_left
+from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Sequence, Tuple
 
 import aiohttp
 import discord
+import numpy as np
+from asyncpg import Record
 
+import crud
 import settings
+from cache import TTLCache
+from http_client import http_client
 from utils import calculate_pages, colour_picker, replace_all
 
 
@@ -14,14 +25,19 @@ class NoDealsFound(Exception):
     """
 
 
-@dataclass
-class Deal:
+deals_cache = TTLCache(ttl=settings.DEALS_CACHE_TTL, maxsize=settings.DEALS_CACHE_SIZE)
+
+
+class Deal(NamedTuple):
     """A class to represent a deal.
 
-    To create a Deal object, record from the API has to be passed in the constructor.
+    Deal objects are immutable and use no per-instance dict. To create a Deal object from a record returned
+    by the API, use Deal.from_api_record().
 
     Attributes
     ----------
+    deal_id : str
+        ID of the deal used by the API
     title : str
         title of the game on discount
     store_id : str
@@ -32,8 +48,6 @@ class Deal:
         normal price of the game
     saved_percentage : int
         how many percent is the price lowered
-    saved_amount : int
-        how much is the price lowered
     metacritic_score : str
         numeric score of the game on https://www.metacritic.com/
     steam_reviews_percent : str
@@ -45,22 +59,317 @@ class Deal:
     thumbnail_url : str
         url of the game thumbnail in .jpg format
     """
-
-    def __init__(self, **attrs):
-        self.title: str = attrs.pop('title', None)
-        self.store_id: str = attrs.pop('storeID', None)
-        self.sale_price = float(attrs.pop('salePrice', 0))
-        self.normal_price = float(attrs.pop('normalPrice', 0))
-        self.saved_percentage = round(float(attrs.pop('savings', 0)))
-        self.metacritic_score: str = attrs.pop('metacriticScore', None)
-        self.steam_reviews_percent: str = attrs.pop('steamRatingPercent', None)
-        self.steam_reviews_count: str = attrs.pop('steamRatingCount', None)
-        self.steam_app_id: str = attrs.pop('steamAppID', None)
-        self.thumbnail_url: str = attrs.pop('thumb', None)
+    deal_id: str = None
+    title: str = None
+    store_id: str = None
+    sale_price: float = 0.0
+    normal_price: float = 0.0
+    saved_percentage: int = 0
+    metacritic_score: str = None
+    steam_reviews_percent: str = None
+    steam_reviews_count: str = None
+    steam_app_id: str = None
+    thumbnail_url: str = None
 
     def saved_amount(self) -> float:
         return round(self.normal_price - self.sale_price, 2)
 
+    def as_dict(self) -> dict:
+        """Return attributes of the deal as a dict, in the form they are stored in database.
+        """
+        return dict(zip(self._fields, self))
+
+    @classmethod
+    def from_api_record(cls, record: dict) -> 'Deal':
+        """Create a Deal object from the record returned by the API.
+
+        :param record: Deal record decoded from the API response.
+        :return: Deal class object.
+        """
+        get = record.get
+        return cls(get('dealID'),
+                   get('title'),
+                   get('storeID'),
+                   float(get('salePrice', 0)),
+                   float(get('normalPrice', 0)),
+                   round(float(get('savings', 0))),
+                   get('metacriticScore'),
+                   get('steamRatingPercent'),
+                   get('steamRatingCount'),
+                   get('steamAppID'),
+                   get('thumb'))
+
+    @classmethod
+    def from_db_record(cls, record: Record) -> 'Deal':
+        """Create a Deal object from the record stored in database.
+
+        :param record: Record object containing data.
+        :return: Deal class object.
+        """
+        return cls(*(record[field] for field in cls._fields))
+
+
+class DealBatch:
+    """A class to represent a list of deals in columnar form, used for filtering and ranking many deals at once.
+
+    Numeric attributes of the deals are kept in parallel NumPy arrays, so filters and rankings are evaluated
+    on whole columns and Deal objects are only touched when the matching ones are returned.
+    Missing Metacritic scores and Steam ratings are stored as NaN, so they never match minimum bounds.
+
+    Attributes
+    ----------
+    deals_list : List[Deal]
+        all deals in the batch
+    columns : Dict[str, numpy.ndarray]
+        numeric columns of the batch, keyed by names from DealBatch.COLUMNS
+    """
+    COLUMNS = ('sale_price', 'normal_price', 'saved_percentage', 'metacritic_score', 'steam_reviews_percent',
+               'store_id')
+
+    def __init__(self, deals_list: List[Deal]):
+        self.deals_list = deals_list
+        self.columns: Dict[str, np.ndarray] = {
+            column: np.fromiter((_to_number(getattr(deal, column)) for deal in deals_list),
+                                dtype=np.float64,
+                                count=len(deals_list))
+            for column in self.COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self.deals_list)
+
+    def mask(self,
+             store_ids: List[str] = None,
+             min_retail_price: float = None,
+             max_retail_price: float = None,
+             min_price: float = None,
+             max_price: float = None,
+             min_metacritic_score: float = None,
+             min_steam_rating: float = None) -> np.ndarray:
+        """Return boolean mask of the deals that match all given filters. Filters set to None are skipped.
+
+        :param store_ids: IDs of the stores used by the API.
+        :param min_retail_price: Retail price that deals have to be more expensive than.
+        :param max_retail_price: Maximum retail price of the deals.
+        :param min_price: Minimum discount price of the deals.
+        :param max_price: Maximum discount price of the deals.
+        :param min_metacritic_score: Minimum Metacritic score of the deals.
+        :param min_steam_rating: Minimum steam rating of the deals.
+        :return: Boolean array with True for every matching deal.
+        """
+        columns = self.columns
+        mask = np.ones(len(self.deals_list), dtype=bool)
+        if store_ids is not None:
+            mask &= np.isin(columns['store_id'], [float(store_id) for store_id in store_ids])
+        if min_retail_price is not None:
+            mask &= columns['normal_price'] > min_retail_price
+        if max_retail_price is not None:
+            mask &= columns['normal_price'] <= max_retail_price
+        if min_price is not None:
+            mask &= columns['sale_price'] >= min_price
+        if max_price is not None:
+            mask &= columns['sale_price'] <= max_price
+        if min_metacritic_score is not None:
+            mask &= columns['metacritic_score'] >= min_metacritic_score
+        if min_steam_rating is not None:
+            mask &= columns['steam_reviews_percent'] >= min_steam_rating
+        return mask
+
+    def rank(self,
+             indices: np.ndarray,
+             order_by: Sequence[str] = (),
+             weights: Dict[str, float] = None) -> np.ndarray:
+        """Return given indices of the deals ordered from the best to the worst.
+
+        If weights are given, deals are ranked primarily by the product of the weighted columns,
+        for example {'saved_percentage': 1, 'steam_reviews_percent': 1} ranks by savings weighted by Steam rating.
+        Columns in order_by are used as the next sorting keys, in the given order. Ties keep the original order.
+
+        :param indices: Indices of the deals to rank.
+        :param order_by: Names of the columns to sort by, in descending order.
+        :param weights: Mapping of column name to the exponent it has in the score.
+        :return: Array of ranked indices.
+        """
+        keys = [np.nan_to_num(self.columns[column][indices]) for column in reversed(order_by)]
+        if weights:
+            score = np.ones(len(indices))
+            for column, weight in weights.items():
+                score *= np.power(np.nan_to_num(self.columns[column][indices]), weight)
+            keys.append(score)
+        if not keys:
+            return indices
+        order = np.lexsort([-key for key in keys])
+        return indices[order]
+
+    def query(self,
+              order_by: Sequence[str] = (),
+              weights: Dict[str, float] = None,
+              amount: int = None,
+              **filters) -> List[Deal]:
+        """Return deals that match given filters, ranked by given columns and trimmed to given amount.
+
+        :param order_by: Names of the columns to sort by, in descending order. See DealBatch.rank().
+        :param weights: Mapping of column name to the exponent it has in the score. See DealBatch.rank().
+        :param amount: Maximum amount of returned deals.
+        :param filters: Filters passed to DealBatch.mask().
+        :return: List of deals as a Deal class objects.
+        """
+        indices = np.flatnonzero(self.mask(**filters))
+        indices = self.rank(indices, order_by=order_by, weights=weights)[:amount]
+        return [self.deals_list[i] for i in indices]
+
+
+def _to_number(value) -> float:
+    if value is None or value == '':
+        return np.nan
+    return float(value)
+
+
+class DealSnapshot:
+    """A class to represent a list of deals fetched at one point in time.
+
+    Deals are partitioned up front by store and retail price band of every channel in settings.CHANNELS_SETTINGS,
+    so each channel gets its deals with a single lookup instead of filtering the whole list.
+
+    Attributes
+    ----------
+    deals_list : List[Deal]
+        all deals in the snapshot, in the order returned by the API
+    batch : DealBatch
+        deals in the snapshot in columnar form
+    snapshot_id : int
+        id of the snapshot in database, None if the snapshot has not been stored
+    created_at : datetime
+        when the snapshot has been created
+    """
+
+    def __init__(self, deals_list: List[Deal], snapshot_id: int = None):
+        self.deals_list = deals_list
+        self.batch = DealBatch(deals_list)
+        self.snapshot_id = snapshot_id
+        self.created_at = datetime.now()
+        self._partitions: Dict[Tuple[str, int, int], List[Deal]] = {}
+        for channel_settings in settings.CHANNELS_SETTINGS.values():
+            self.get_deals(channel_settings['store'],
+                           channel_settings['min_retail_price'],
+                           channel_settings['max_retail_price'])
+
+    def __len__(self) -> int:
+        return len(self.deals_list)
+
+    def get_deals(self, store: str, min_retail_price: int, max_retail_price: int) -> List[Deal]:
+        """Return deals from given store with retail price in range (min_retail_price, max_retail_price>.
+        Partition is computed on first request and reused afterwards.
+
+        :param store: Store name passed as string. Available options: 'steam', 'gog', 'all'.
+        :param min_retail_price: Retail price that deals have to be more expensive than.
+        :param max_retail_price: Maximum retail price of the deals.
+        :return: List of deals as a Deal class objects.
+        """
+        key = (store, min_retail_price, max_retail_price)
+        if key not in self._partitions:
+            self._partitions[key] = self.batch.query(store_ids=settings.STORES_MAPPING[store].split(','),
+                                                     min_retail_price=min_retail_price,
+                                                     max_retail_price=max_retail_price)
+        return self._partitions[key]
+
+
+async def get_deals_snapshot() -> DealSnapshot:
+    """Return deals for all stores as a DealSnapshot, served from the deals cache when possible.
+
+    :return: DealSnapshot class object.
+    :raises NoDealsFound: When no deals are found.
+    """
+    key = ('snapshot', settings.STEAM_DEALS_AMOUNT, settings.GOG_DEALS_AMOUNT)
+    return await deals_cache.get_or_fetch(key, fetch_deals_snapshot)
+
+
+async def fetch_deals_snapshot() -> DealSnapshot:
+    """Fetch deals for every store, store them in database and return them as a DealSnapshot.
+    If the API is unavailable, returns deals from the last snapshot stored in database instead.
+
+    Each store is fetched with its own query, concurrently, so that every store gets its full amount of deals,
+    settings.STEAM_DEALS_AMOUNT and settings.GOG_DEALS_AMOUNT, no matter how many deals the other one has.
+
+    :return: DealSnapshot class object.
+    :raises NoDealsFound: When no deals are found.
+    """
+    amounts = {
+        'steam': settings.STEAM_DEALS_AMOUNT,
+        'gog': settings.GOG_DEALS_AMOUNT
+    }
+    try:
+        deals_list = await gather_stores(amounts, lambda store, amount: fetch_deals(store=store, amount=amount))
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        logging.exception('Unable to fetch deals from API, using last stored snapshot')
+        deals_list = await gather_stores(amounts, lambda store, amount: get_stored_deals(store=store,
+                                                                                         amount=amount,
+                                                                                         max_price=None))
+        db_snapshot = await crud.deal.get_latest_snapshot()
+        return DealSnapshot(deals_list, db_snapshot['id'])
+
+    try:
+        snapshot_id = await crud.deal.create_snapshot([deal.as_dict() for deal in deals_list])
+    except Exception:
+        logging.exception('Unable to store snapshot of deals')
+        snapshot_id = None
+    return DealSnapshot(deals_list, snapshot_id)
+
+
+async def gather_stores(amounts: Dict[str, int],
+                        fetch: Callable[[str, int], Awaitable[List[Deal]]]) -> List[Deal]:
+    """Run fetch for every store concurrently and join the results, in the order of the stores.
+    Stores without any deals are skipped.
+
+    :param amounts: Amount of deals to fetch per store name.
+    :param fetch: Coroutine function called with store name and amount of deals.
+    :return: List of deals as a Deal class objects.
+    :raises NoDealsFound: When no store has any deals.
+    """
+    responses = await asyncio.gather(*(fetch(store, amount) for store, amount in amounts.items()),
+                                     return_exceptions=True)
+    deals_list = []
+    for response in responses:
+        if isinstance(response, NoDealsFound):
+            continue
+        if isinstance(response, BaseException):
+            raise response
+        deals_list.extend(response)
+    if not deals_list:
+        raise NoDealsFound('No deals found in any store')
+    return deals_list
+
+
+async def get_stored_deals(store: str = 'all',
+                           amount: int = 60,
+                           sort_by: str = None,
+                           min_price: int = None,
+                           max_price: int = 60,
+                           min_steam_rating: int = None,
+                           aaa: bool = False) -> List[Deal]:
+    """Return deals from the last snapshot stored in database basing on given parameters.
+
+    :param store: Store name passed as string. Available options: 'steam', 'gog', 'all'.
+    :param amount: Amount of deals returned in the list.
+    :param sort_by: Sorting criteria of the API the deals are sorted by. Default is the order they have been fetched in.
+    :param min_price: Minimum discount price of the deals.
+    :param max_price: Maximum discount price of the deals.
+    :param min_steam_rating: Minimum steam rating of the deals.
+    :param aaa: If True, returns only deals with retail price more than 29$.
+    :return: List of deals as a Deal class objects.
+    :raises NoDealsFound: When no stored deals match given parameters.
+    """
+    db_deals = await crud.deal.get_all_by_filters(store_ids=settings.STORES_MAPPING[store].split(','),
+                                                  amount=amount,
+                                                  sort_by=sort_by,
+                                                  min_price=min_price,
+                                                  max_price=max_price,
+                                                  min_steam_rating=min_steam_rating,
+                                                  aaa=aaa)
+    if not db_deals:
+        raise NoDealsFound('No stored deals found with provided filters')
+    return [Deal.from_db_record(db_deal) for db_deal in db_deals]
+
 
 async def get_deals(store: str = 'all',
                     amount: int = 60,
@@ -69,7 +378,55 @@ async def get_deals(store: str = 'all',
                     max_price: int = 60,
                     min_steam_rating: int = None,
                     aaa: bool = False) -> List[Deal]:
-    """Fetch deals from API basing on given parameters.
+    """Return deals basing on given parameters, served from the deals cache when possible.
+
+    Results are cached for settings.DEALS_CACHE_TTL seconds per unique set of parameters,
+    and concurrent calls with the same parameters share one request to the API.
+    If the API is unavailable, deals are served from the last snapshot stored in database.
+
+    :param store: Store name passed as string. Available options: 'steam', 'gog', 'all'.
+    :param amount: Amount of deals returned in the list.
+    :param sort_by: Specifies sorting criteria in the API.
+    :param min_price: Minimum discount price of the deals.
+    :param max_price: Maximum discount price of the deals.
+    :param min_steam_rating: Minimum steam rating of the deals.
+    :param aaa: If True, returns only deals with retail price more than 29$.
+    :return: List of deals as a Deal class objects.
+    :raises ValueError: When store parameter passed inside the function is not one of the possible options.
+    :raises NoDealsFound: When no deals are found with given parameters.
+    """
+    if store not in settings.STORES_MAPPING.keys():
+        raise ValueError('store must be one of %r.' % settings.STORES_MAPPING.keys())
+
+    key = (store, amount, sort_by, min_price or None, max_price, min_steam_rating or None, bool(aaa))
+    try:
+        deals_list = await deals_cache.get_or_fetch(key, lambda: fetch_deals(store=store,
+                                                                             amount=amount,
+                                                                             sort_by=sort_by,
+                                                                             min_price=min_price,
+                                                                             max_price=max_price,
+                                                                             min_steam_rating=min_steam_rating,
+                                                                             aaa=aaa))
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        logging.exception('Unable to fetch deals from API, using last stored snapshot')
+        deals_list = await get_stored_deals(store=store,
+                                            amount=amount,
+                                            sort_by=sort_by,
+                                            min_price=min_price,
+                                            max_price=max_price,
+                                            min_steam_rating=min_steam_rating,
+                                            aaa=aaa)
+    return list(deals_list)
+
+
+async def fetch_deals(store: str = 'all',
+                      amount: int = 60,
+                      sort_by: str = 'Metacritic',
+                      min_price: int = None,
+                      max_price: int = 60,
+                      min_steam_rating: int = None,
+                      aaa: bool = False) -> List[Deal]:
+    """Fetch deals from API basing on given parameters, bypassing the deals cache.
 
     :param store: Store name passed as string. Available options: 'steam', 'gog', 'all'.
     :param amount: Amount of deals returned in the list.
@@ -85,81 +442,141 @@ async def get_deals(store: str = 'all',
     if store not in settings.STORES_MAPPING.keys():
         raise ValueError('store must be one of %r.' % settings.STORES_MAPPING.keys())
 
-    url = f'{settings.API_BASE_URL}' \
-          f'?storeID={settings.STORES_MAPPING[store]}' \
-          f'&sortBy={sort_by}' \
-          f'&upperPrice={max_price}' \
-          f'&onSale=1' \
-          f'&pageSize=60' \
-          f'&pageNumber=0'
+    params = {
+        'storeID': settings.STORES_MAPPING[store],
+        'sortBy': sort_by,
+        'onSale': 1,
+        'pageSize': settings.API_PAGE_SIZE
+    }
+    if max_price is not None:
+        params['upperPrice'] = max_price
     if min_price:
-        url += f'&lowerPrice={min_price}'
+        params['lowerPrice'] = min_price
     if min_steam_rating:
-        url += f'&steamRating={min_steam_rating}'
+        params['steamRating'] = min_steam_rating
     if aaa:
-        url += '&AAA=1'
-
-    pages = calculate_pages(amount, 60)
-    session = aiohttp.ClientSession()
-    deals_list: List[Deal] = []
-
-    for e in range(0, pages):
-        response = await session.get(url)
-        response_list = await response.json()
-        if len(response_list) == 0:
-            if e == 0:
-                await session.close()
-                raise NoDealsFound('No deals found from provided API filters')
-        for i, record in enumerate(response_list):
-            if 60 > amount == i:
-                break
-            deal = Deal(**record)
-            deals_list.append(deal)
-        url = url.replace(f'&pageNumber={e}', f'&pageNumber={e + 1}')
-        amount = amount - 60
-    await session.close()
-    return deals_list
+        params['AAA'] = 1
+
+    pages = calculate_pages(amount, settings.API_PAGE_SIZE)
+    semaphore = asyncio.Semaphore(settings.API_MAX_CONCURRENT_PAGES)
+    last_page = pages - 1
+
+    async def fetch_page(page_number: int) -> List[dict]:
+        nonlocal last_page
+        async with semaphore:
+            # Pages after the one that came back short are empty, so there is no need to request them.
+            if page_number > last_page:
+                return []
+            records = await http_client.get_json(settings.API_BASE_URL, params={**params, 'pageNumber': page_number})
+        if len(records) < settings.API_PAGE_SIZE:
+            last_page = min(last_page, page_number)
+        return records
+
+    responses = await asyncio.gather(*(fetch_page(page_number) for page_number in range(0, pages)))
+    records = list(chain.from_iterable(responses))[:amount]
+    if not records:
+        raise NoDealsFound('No deals found from provided API filters')
+    return [Deal.from_api_record(record) for record in records]
+
+
+class RandomDealPool:
+    """A class to represent a pool of Steam and GOG deals that random deals are drawn from.
+
+    Deals are kept sorted by sale price, so deals above given minimum price are found with a binary search
+    and drawn uniformly without any requests to the API.
+
+    Attributes
+    ----------
+    deals_list : List[Deal]
+        deals in the pool, sorted by sale price
+    sale_prices : List[float]
+        sale prices of the deals, in the same order as deals_list
+    refreshed_at : float
+        monotonic time the last refresh has finished at, None if the pool has never been refreshed
+    """
+
+    def __init__(self):
+        self.deals_list: List[Deal] = []
+        self.sale_prices: List[float] = []
+        self.refreshed_at: float = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.deals_list)
+
+    async def refresh(self) -> None:
+        """Replace deals in the pool with settings.RANDOM_POOL_SIZE best deals from the API.
+        If the API is unavailable, deals from the last snapshot stored in database are used instead.
+        Does nothing if another refresh has finished while waiting for the lock, so concurrent calls
+        result in a single request.
 
+        :return: None
+        :raises NoDealsFound: When no deals are found.
+        """
+        requested_at = time.monotonic()
+        async with self._lock:
+            if self.refreshed_at is not None and self.refreshed_at >= requested_at:
+                return
+            try:
+                deals_list = await fetch_deals(store='all', amount=settings.RANDOM_POOL_SIZE, max_price=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                logging.exception('Unable to fetch random deals pool from API, using last stored snapshot')
+                deals_list = await get_stored_deals(store='all', amount=settings.RANDOM_POOL_SIZE, max_price=None)
+            deals_list = sorted(deals_list, key=lambda deal: deal.sale_price)
+            self.deals_list = deals_list
+            self.sale_prices = [deal.sale_price for deal in deals_list]
+            self.refreshed_at = time.monotonic()
+        logging.info(f'Random deals pool refreshed with {len(deals_list)} deals')
 
-async def get_random_deal(min_price: int = None,
-                          retry_count: int = 5) -> Deal:
-    """Fetch random deal from API.
+    async def sample(self, min_price: int = None) -> Deal:
+        """Return random deal from the pool. If the pool is empty, it is filled first.
+
+        :param min_price: Minimum discount price of the deal.
+        :return: Deal class object.
+        :raises NoDealsFound: When there is no deal in the pool with given minimum price.
+        """
+        if not self.deals_list:
+            await self.refresh()
+        start = bisect_left(self.sale_prices, min_price or 0)
+        if start == len(self.deals_list):
+            raise NoDealsFound('No deals found in random deals pool with provided minimum price')
+        return self.deals_list[random.randrange(start, len(self.deals_list))]
+
+
+random_pool = RandomDealPool()
+
+
+async def get_random_deal(min_price: int = None) -> Deal:
+    """Return random deal from the random deals pool.
 
     This returns only a deal that is available only in either Steam or GOG.
 
     :param min_price: Minimum discount price of the deal.
-    :param retry_count: How many iterations to make in order to find the deal.
-    :return: List of deals as a Deal class objects.
+    :return: Deal class object.
     :raises NoDealsFound: When no random deal is found.
     """
-    url = f'{settings.API_BASE_URL}' \
-          f'?storeID=1,7' \
-          f'&sortBy=Metacritic' \
-          f'&onSale=1' \
-          f'&pageSize=1' \
-          f'&pageNumber={random.randint(0, 1000)}'
-    if min_price:
-        url += f'&lowerPrice={min_price}'
-
-    async with aiohttp.ClientSession() as session:
-        for i in range(0, retry_count):
-            if i + 1 == retry_count:
-                raise NoDealsFound
-            async with session.get(url) as response:
-                response_list = await response.json()
-                if len(response_list) == 0:
-                    continue
-                record = response_list[0]
-                deal = Deal(**record)
-                return deal
+    return await random_pool.sample(min_price)
 
 
 def get_embed_from_deal(deal: Deal) -> discord.Embed:
     """Function that takes a Deal class object as input parameter and converts it into discord.py Embed object.
 
-    :param deal: Deal dataclass object.
+    :param deal: Deal class object.
     :return: discord.py Embed class object.
     """
+    return discord.Embed.from_dict(render_deal_embed(deal))
+
+
+@lru_cache(maxsize=settings.EMBED_CACHE_SIZE)
+def render_deal_embed(deal: Deal) -> dict:
+    """Function that renders a Deal class object into Discord embed payload.
+
+    Deal objects are immutable, so rendered payloads are cached per deal and each deal is rendered only once.
+    Returned dict is shared between callers and must not be modified.
+
+    :param deal: Deal class object.
+    :return: Embed payload as a dict.
+    """
     if deal.store_id == '1':
         deal_url = f'https://store.steampowered.com/app/{deal.steam_app_id}'
     else:
@@ -181,4 +598,4 @@ def get_embed_from_deal(deal: Deal) -> discord.Embed:
                                       f"*Link:* {deal_url}/",
                           colour=colour_picker(deal.saved_percentage))
     embed.set_image(url=deal.thumbnail_url)
-    return embed
+    return embed.to_dict()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List
+
+import settings
+from send_queue import send_queue
+
+
+class DeliveryProgress:
+    """A class to track progress of the deliveries submitted to the DeliveryEngine.
+
+    Attributes
+    ----------
+    submitted : int
+        amount of deliveries submitted since the engine has been idle
+    completed : int
+        amount of deliveries that finished successfully
+    failed : int
+        amount of deliveries that raised an exception
+    started_at : float
+        monotonic time of the first submission since the engine has been idle
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def pending(self) -> int:
+        return self.submitted - self.completed - self.failed
+
+    @property
+    def rate(self) -> float:
+        """Amount of finished deliveries per minute."""
+        elapsed = time.monotonic() - self.started_at
+        return (self.completed + self.failed) / elapsed * 60 if elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (f'{self.completed + self.failed}/{self.submitted} deliveries finished '
+                f'({self.failed} failed, {self.rate:.1f}/min)')
+
+
+class DeliveryEngine:
+    """Work queue that runs guild deliveries with a fixed pool of workers.
+
+    Apart from the amount of guilds processed at the same time, which is bounded by the amount of workers,
+    sending to channels is bounded globally and per guild with channel_slot(), so a busy hour
+    drains at a steady pace instead of starting every delivery at once.
+    """
+
+    def __init__(self,
+                 workers: int = settings.DELIVERY_WORKERS,
+                 max_channels: int = settings.DELIVERY_MAX_CHANNELS,
+                 max_channels_per_guild: int = settings.DELIVERY_MAX_CHANNELS_PER_GUILD):
+        self.workers = workers
+        self.max_channels = max_channels
+        self.max_channels_per_guild = max_channels_per_guild
+        self.progress = DeliveryProgress()
+        self._queue: asyncio.Queue = None
+        self._channels_semaphore: asyncio.Semaphore = None
+        self._guild_semaphores: Dict[int, asyncio.Semaphore] = {}
+        self._guild_slots: Dict[int, int] = {}
+        self._worker_tasks: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    def start(self) -> None:
+        """Create the queue and start the workers. Does nothing if the engine is already running.
+
+        :return: None
+        """
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue()
+        self._channels_semaphore = asyncio.Semaphore(self.max_channels)
+        self._worker_tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers. Deliveries that are still in the queue are dropped.
+
+        :return: None
+        """
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def submit(self, guild_id: int, delivery: Callable[[], Awaitable]) -> None:
+        """Put delivery for given guild in the queue.
+
+        :param guild_id: ID of the Guild in Discord.
+        :param delivery: Coroutine function called without arguments, that delivers deals to the guild.
+        :return: None
+        """
+        self.start()
+        if self.progress.pending == 0:
+            self.progress.reset()
+        self.progress.submitted += 1
+        self._queue.put_nowait((guild_id, delivery))
+
+    async def join(self) -> None:
+        """Wait until every delivery in the queue has been processed.
+
+        :return: None
+        """
+        if self.is_running:
+            await self._queue.join()
+
+    @asynccontextmanager
+    async def channel_slot(self, guild_id: int):
+        """Asynchronous context manager that waits until sending to one more channel of given guild
+        fits within the global and per guild limits.
+
+        :param guild_id: ID of the Guild in Discord.
+        """
+        self.start()
+        guild_semaphore = self._guild_semaphores.get(guild_id)
+        if guild_semaphore is None:
+            guild_semaphore = self._guild_semaphores[guild_id] = asyncio.Semaphore(self.max_channels_per_guild)
+        self._guild_slots[guild_id] = self._guild_slots.get(guild_id, 0) + 1
+        try:
+            async with guild_semaphore, self._channels_semaphore:
+                yield
+        finally:
+            self._guild_slots[guild_id] -= 1
+            if not self._guild_slots[guild_id]:
+                del self._guild_slots[guild_id]
+                del self._guild_semaphores[guild_id]
+
+    async def _worker(self) -> None:
+        while True:
+            guild_id, delivery = await self._queue.get()
+            try:
+                await delivery()
+                self.progress.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.progress.failed += 1
+                logging.exception(f'Delivery to guild {guild_id} failed')
+            finally:
+                self._queue.task_done()
+            if self.progress.pending == 0:
+                logging.info(f'Delivery queue drained: {self.progress}, {send_queue.stats}')
+                send_queue.stats.reset()
+            elif (self.progress.completed + self.progress.failed) % settings.DELIVERY_PROGRESS_INTERVAL == 0:
+                logging.info(f'Delivery progress: {self.progress}, {send_queue.stats}')
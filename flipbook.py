@@ -0,0 +1,149 @@
+import logging
+import time
+from typing import Dict, List
+
+import discord
+from discord.ext import commands, tasks
+
+import settings
+from cache import TTLCache
+from deal import get_deals, render_deal_embed
+
+PREVIOUS_PAGE_EMOJI = '◀️'
+NEXT_PAGE_EMOJI = '▶️'
+
+pages_cache = TTLCache(ttl=settings.DEALS_CACHE_TTL, maxsize=settings.FLIPBOOK_PAGES_CACHE_SIZE)
+
+
+async def get_pages(min_price: int, max_price: int) -> List[discord.Embed]:
+    """Return pre-rendered flipbook pages with deals in given price range, shared between all flipbooks.
+
+    :param min_price: Minimum discount price of the deals.
+    :param max_price: Maximum discount price of the deals.
+    :return: List of discord.py Embed class objects, one per page.
+    :raises NoDealsFound: When no deals are found in given price range.
+    """
+    async def render_pages() -> List[discord.Embed]:
+        deals_list = await get_deals(min_price=min_price, max_price=max_price, amount=60)
+        return [discord.Embed.from_dict(render_deal_embed(deal)) for deal in deals_list]
+
+    return await pages_cache.get_or_fetch((min_price, max_price), render_pages)
+
+
+class Flipbook:
+    """A class to represent a flipbook of deals posted in a channel.
+
+    Attributes
+    ----------
+    author : discord.User
+        user who requested the flipbook, the only one who can turn its pages
+    start_message : discord.Message
+        message introducing the flipbook
+    message : discord.Message
+        message displaying current page of the flipbook
+    pages : List[discord.Embed]
+        pre-rendered pages of the flipbook
+    current_page : int
+        number of the displayed page, starting from 1
+    expires_at : float
+        monotonic time after which the flipbook gets deleted
+    """
+
+    def __init__(self,
+                 author: discord.User,
+                 start_message: discord.Message,
+                 message: discord.Message,
+                 pages: List[discord.Embed]):
+        self.author = author
+        self.start_message = start_message
+        self.message = message
+        self.pages = pages
+        self.current_page = 1
+        self.expires_at = 0.0
+        self.touch()
+
+    @property
+    def content(self) -> str:
+        return f'**Page {self.current_page}/{len(self.pages)}**'
+
+    @property
+    def embed(self) -> discord.Embed:
+        return self.pages[self.current_page - 1]
+
+    def touch(self) -> None:
+        """Postpone expiration of the flipbook by settings.FLIPBOOK_TIMEOUT seconds.
+        """
+        self.expires_at = time.monotonic() + settings.FLIPBOOK_TIMEOUT
+
+    def turn(self, emoji: str) -> None:
+        """Turn to the next or previous page, depending on given emoji. Wraps around at both ends.
+
+        :param emoji: NEXT_PAGE_EMOJI or PREVIOUS_PAGE_EMOJI.
+        :return: None
+        """
+        step = 1 if emoji == NEXT_PAGE_EMOJI else -1
+        self.current_page = (self.current_page - 1 + step) % len(self.pages) + 1
+
+
+class FlipbookManager(commands.Cog):
+    """Cog designed for managing all active flipbooks with a single reaction listener.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot: commands.Bot = bot
+        self.flipbooks: Dict[int, Flipbook] = {}
+        self.expire_flipbooks.start()
+
+    async def open(self, ctx: commands.Context, min_price: int, max_price: int) -> Flipbook:
+        """Post a flipbook of deals in given price range in the channel the command has been invoked in.
+
+        :param ctx: discord.py Context class object of the command.
+        :param min_price: Minimum discount price of the deals.
+        :param max_price: Maximum discount price of the deals.
+        :return: Flipbook class object.
+        :raises NoDealsFound: When no deals are found in given price range.
+        """
+        pages = await get_pages(min_price, max_price)
+        start_message = await ctx.send(content=f"```Here's a flipbook of deals for you, {ctx.author.name}!```")
+        message = await ctx.send(content=f'**Page 1/{len(pages)}**', embed=pages[0])
+        flipbook = Flipbook(ctx.author, start_message, message, pages)
+        self.flipbooks[message.id] = flipbook
+        await message.add_reaction(PREVIOUS_PAGE_EMOJI)
+        await message.add_reaction(NEXT_PAGE_EMOJI)
+        return flipbook
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        # Raw event, so page turns keep working after the flipbook message drops out of the message cache.
+        flipbook = self.flipbooks.get(payload.message_id)
+        emoji = str(payload.emoji)
+        if (not flipbook
+                or payload.user_id == self.bot.user.id
+                or emoji not in [PREVIOUS_PAGE_EMOJI, NEXT_PAGE_EMOJI]):
+            return
+        flipbook.touch()
+        if payload.user_id == flipbook.author.id:
+            flipbook.turn(emoji)
+            await flipbook.message.edit(content=flipbook.content, embed=flipbook.embed)
+        await flipbook.message.remove_reaction(emoji, discord.Object(id=payload.user_id))
+
+    @tasks.loop(seconds=10)
+    async def expire_flipbooks(self):
+        """Delete flipbooks that nobody has reacted to for settings.FLIPBOOK_TIMEOUT seconds.
+
+        :return: None
+        """
+        now = time.monotonic()
+        for message_id, flipbook in list(self.flipbooks.items()):
+            if flipbook.expires_at > now:
+                continue
+            del self.flipbooks[message_id]
+            try:
+                await flipbook.start_message.delete()
+                await flipbook.message.delete()
+            except discord.errors.HTTPException:
+                logging.warning(f'Unable to delete flipbook in {flipbook.message.channel}')
+
+    @expire_flipbooks.before_loop
+    async def before_expire_flipbooks(self):
+        await self.bot.wait_until_ready()
@@ -0,0 +1,65 @@
+import logging
+from typing import Any
+
+import aiohttp
+
+import settings
+
+
+class HTTPClient:
+    """Long-lived HTTP client owned by the bot, used for all requests to the upstream APIs.
+
+    It keeps a single aiohttp.ClientSession with a pooled connector, so connections, TLS sessions
+    and DNS lookups are reused between requests instead of being established for every call.
+    """
+
+    def __init__(self):
+        self._session: aiohttp.ClientSession = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None and not self._session.closed
+
+    async def open(self) -> None:
+        """Create the underlying session and connection pool. Does nothing if the client is already open.
+
+        :return: None
+        """
+        if self.is_open:
+            return
+        connector = aiohttp.TCPConnector(limit=settings.HTTP_POOL_SIZE,
+                                         limit_per_host=settings.HTTP_POOL_SIZE_PER_HOST,
+                                         keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+                                         ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL)
+        timeout = aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT,
+                                        connect=settings.HTTP_CONNECT_TIMEOUT)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, raise_for_status=True)
+        logging.info('HTTP client session opened')
+
+    async def close(self) -> None:
+        """Close the underlying session together with all pooled connections.
+
+        :return: None
+        """
+        if not self.is_open:
+            return
+        await self._session.close()
+        self._session = None
+        logging.info('HTTP client session closed')
+
+    async def get_json(self, url: str, params: dict = None) -> Any:
+        """Send GET request to given url and return decoded JSON body of the response.
+        Opens the client first if it is not open yet.
+
+        :param url: Requested url.
+        :param params: Query string parameters of the request.
+        :return: Decoded JSON body.
+        :raises aiohttp.ClientError: When request fails or response status is not successful.
+        """
+        if not self.is_open:
+            await self.open()
+        async with self._session.get(url, params=params) as response:
+            return await response.json()
+
+
+http_client = HTTPClient()
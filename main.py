@@ -7,31 +7,27 @@ import crud
 import database.base
 import settings
 from commands import Commands
-from database.base import Base
+from database.migrations import migrate
 from database.session import database, engine
-from deal import get_deals
+from flipbook import FlipbookManager
+from http_client import http_client
+from onboarding import Onboarding
+from reconciliation import Reconciliation
 from tasks import ScheduledTasks
-from utils import initialize_channels
 
-bot = commands.Bot(command_prefix=settings.PREFIX + ' ')
 
+class GameDealsBot(commands.AutoShardedBot):
+    async def close(self):
+        scheduled_tasks_cog: ScheduledTasks = self.get_cog('ScheduledTasks')
+        if scheduled_tasks_cog:
+            await scheduled_tasks_cog.stop()
+        await super().close()
+        await http_client.close()
 
-@bot.event
-async def on_guild_join(guild: discord.Guild):
-    logging.info(f'Joined guild {guild.name}')
-    try:
-        category, channels = await initialize_channels(guild)
-        if not await crud.guild.get_by_discord_id(guild.id):
-            await crud.channel.bulk_create(channels, category, guild)
-
-        steam_deals_list = await get_deals(amount=settings.STEAM_DEALS_AMOUNT, store='steam')
-        gog_deals_list = await get_deals(amount=settings.GOG_DEALS_AMOUNT, store='gog')
-        scheduled_tasks_cog: ScheduledTasks = bot.get_cog("ScheduledTasks")
-        await scheduled_tasks_cog.deals_task(guild, steam_deals_list + gog_deals_list)
-    except discord.errors.Forbidden:
-        logging.info(f'Leaving guild {guild.name} because of insufficient permissions')
-        await guild.leave()
-        return
+
+bot = GameDealsBot(command_prefix=settings.PREFIX + ' ',
+                   shard_count=settings.SHARD_COUNT or None,
+                   shard_ids=settings.SHARD_IDS or None)
 
 
 @bot.event
@@ -53,7 +49,8 @@ async def on_command_error(ctx: commands.Context, error):
 
 @bot.event
 async def on_ready():
-    Base.metadata.create_all(engine)
+    await crud.config_cache.load()
+    await bot.get_cog('Reconciliation').reconcile()
 
     await bot.change_presence(status=discord.Status.online, activity=discord.Game(f"Listening on {settings.PREFIX}"))
     logging.info('Bot started')
@@ -62,6 +59,12 @@ async def on_ready():
 @bot.event
 async def on_connect():
     await database.connect()
+    await http_client.open()
+
+
+@bot.event
+async def on_shard_ready(shard_id: int):
+    logging.info(f'Shard {shard_id} ready')
 
 
 @bot.event
@@ -79,15 +82,17 @@ async def on_resumed():
 async def on_guild_channel_update(before: discord.TextChannel, after: discord.TextChannel):
     if not isinstance(before, discord.TextChannel):
         return
-    db_channels = await crud.channel.get_all_by_guild_discord_id(before.guild.id)
-    for db_channel in db_channels:
-        if before.id == db_channel['discord_id'] and after.name != db_channel['name']:
-            await crud.channel.update(db_channel['id'], {'name': after.name})
-            break
+    db_channel = await crud.channel.get_by_discord_id(before.id)
+    if db_channel and after.name != db_channel['name']:
+        await crud.channel.update(db_channel['id'], {'name': after.name})
 
 
 logging.basicConfig(format="%(asctime)s %(levelname)s: %(message)s", level=logging.INFO)
+migrate(engine)
 bot.add_cog(ScheduledTasks(bot))
+bot.add_cog(FlipbookManager(bot))
+bot.add_cog(Onboarding(bot))
+bot.add_cog(Reconciliation(bot))
 bot.add_cog(Commands(bot))
 
 bot.run(settings.BOT_TOKEN)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import List
+
+import discord
+from discord.http import Route
+
+from send_queue import send_queue
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBEDS_LENGTH = 6000
+MAX_BULK_DELETE = 100
+# Discord refuses to bulk delete messages older than 14 days. The margin covers the time spent waiting to send.
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=10)
+
+
+def embed_length(embed: dict) -> int:
+    """Function that calculates length of the embed payload the way Discord counts it towards MAX_EMBEDS_LENGTH.
+
+    :param embed: Embed payload.
+    :return: Total length of the texts in the embed.
+    """
+    length = len(embed.get('title', '')) + len(embed.get('description', ''))
+    length += len(embed.get('footer', {}).get('text', '')) + len(embed.get('author', {}).get('name', ''))
+    for field in embed.get('fields', []):
+        length += len(field.get('name', '')) + len(field.get('value', ''))
+    return length
+
+
+def batch_embeds(embeds: List[dict]) -> List[List[dict]]:
+    """Function that packs embed payloads into batches that fit in a single Discord message.
+    Each batch has at most MAX_EMBEDS_PER_MESSAGE embeds and their total length is at most MAX_EMBEDS_LENGTH.
+    Order of the embeds is preserved.
+
+    :param embeds: List of embed payloads.
+    :return: List of batches of embed payloads.
+    """
+    batches = []
+    batch = []
+    batch_length = 0
+    for embed in embeds:
+        length = embed_length(embed)
+        if batch and (len(batch) == MAX_EMBEDS_PER_MESSAGE or batch_length + length > MAX_EMBEDS_LENGTH):
+            batches.append(batch)
+            batch = []
+            batch_length = 0
+        batch.append(embed)
+        batch_length += length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def build_payload(content: str = None, embeds: List[dict] = None) -> dict:
+    """Function that builds JSON payload of a message.
+
+    :param content: Text content of the message.
+    :param embeds: List of embed payloads, at most MAX_EMBEDS_PER_MESSAGE.
+    :return: Message payload.
+    """
+    return {
+        'content': content,
+        'embeds': list(embeds or [])
+    }
+
+
+def payload_digest(payload: dict) -> str:
+    """Function that calculates digest of the message payload, used to tell whether a posted message has to change.
+
+    :param payload: Message payload.
+    :return: Hex digest of the payload.
+    """
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def send_payload(channel: discord.TextChannel, payload: dict) -> int:
+    """Function that sends a message with given payload to the channel.
+
+    discord.py only supports a single embed per message, so the request is made directly
+    with the HTTP client of the bot. Like the other requests in this module, it is paced by the send queue.
+
+    :param channel: discord.py Channel class object.
+    :param payload: Message payload.
+    :return: ID of the sent message in Discord.
+    """
+    await send_queue.acquire('send', channel.id)
+    route = Route('POST', '/channels/{channel_id}/messages', channel_id=channel.id)
+    data = await channel._state.http.request(route, json=payload)
+    return int(data['id'])
+
+
+async def edit_payload(channel: discord.TextChannel, message_id: int, payload: dict) -> None:
+    """Function that replaces content and embeds of the message in the channel with given payload.
+
+    :param channel: discord.py Channel class object.
+    :param message_id: ID of the message in Discord.
+    :param payload: Message payload.
+    :return: None
+    """
+    await send_queue.acquire('edit', channel.id)
+    route = Route('PATCH', '/channels/{channel_id}/messages/{message_id}',
+                  channel_id=channel.id, message_id=message_id)
+    await channel._state.http.request(route, json=payload)
+
+
+async def delete_messages(channel: discord.TextChannel, message_ids: List[int]) -> None:
+    """Function that deletes messages with given IDs from the channel, without reading history of the channel.
+
+    Messages younger than BULK_DELETE_MAX_AGE, judging by the timestamp in their ID, are deleted with bulk delete
+    for up to MAX_BULK_DELETE messages at once. Older ones are deleted one by one, skipping those that are already gone.
+
+    :param channel: discord.py Channel class object.
+    :param message_ids: IDs of the messages in Discord.
+    :return: None
+    """
+    bulk_deletable_after = datetime.utcnow() - BULK_DELETE_MAX_AGE
+    recent_message_ids = [message_id for message_id in message_ids
+                          if discord.utils.snowflake_time(message_id) > bulk_deletable_after]
+    single_message_ids = [message_id for message_id in message_ids
+                          if discord.utils.snowflake_time(message_id) <= bulk_deletable_after]
+    for i in range(0, len(recent_message_ids), MAX_BULK_DELETE):
+        chunk = recent_message_ids[i:i + MAX_BULK_DELETE]
+        if len(chunk) == 1:
+            single_message_ids.extend(chunk)
+            continue
+        await send_queue.acquire('delete', channel.id)
+        await channel._state.http.delete_messages(channel.id, chunk)
+    for message_id in single_message_ids:
+        await send_queue.acquire('delete_message', channel.id)
+        try:
+            await channel._state.http.delete_message(channel.id, message_id)
+        except discord.errors.NotFound:
+            pass
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from typing import List, Set
+
+import discord
+from asyncpg import Record
+from discord.ext import commands
+
+import crud
+import settings
+from deal import DealSnapshot, get_deals_snapshot
+from tasks import ScheduledTasks
+from utils import initialize_channels
+
+
+class Onboarding(commands.Cog):
+    """Cog designed for setting up guilds the bot has joined.
+
+    Joined guilds wait in a bounded queue and are set up by a fixed pool of workers, so a burst of joins
+    does not take over the bot. Deals are delivered by the same worker, so the workers bound join deliveries too
+    and a burst of joins never queues up ahead of the scheduled deliveries. Guilds that are already queued
+    are skipped, and every step of the onboarding is idempotent: existing channels are reused and guild, category
+    and channels are upserted, so running it again for a guild that is already in database, even with stale rows,
+    brings it back in line.
+    """
+
+    def __init__(self, bot: commands.Bot,
+                 workers: int = settings.ONBOARDING_WORKERS,
+                 queue_size: int = settings.ONBOARDING_QUEUE_SIZE):
+        self.bot: commands.Bot = bot
+        self.scheduled_tasks_cog: ScheduledTasks = self.bot.get_cog('ScheduledTasks')
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue = None
+        self._pending: Set[int] = set()
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Create the queue and start the workers. Does nothing if they are already running.
+
+        :return: None
+        """
+        if self._worker_tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    def cog_unload(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
+
+    async def submit(self, guild: discord.Guild) -> None:
+        """Put the guild in the onboarding queue, waiting for a free place if the queue is full.
+        Does nothing if the guild is already queued.
+
+        :param guild: discord.py Guild class object.
+        :return: None
+        """
+        self.start()
+        if guild.id in self._pending:
+            return
+        self._pending.add(guild.id)
+        await self._queue.put(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        logging.info(f'Joined guild {guild.name}')
+        await self.submit(guild)
+
+    async def onboard(self, guild: discord.Guild) -> None:
+        """Create channels required by the bot in the guild, save them in database
+        and deliver the current deals to the guild.
+
+        :param guild: discord.py Guild class object.
+        :return: None
+        """
+        if not self.bot.get_guild(guild.id):
+            return
+        try:
+            category, channels = await initialize_channels(guild)
+            db_channels = await crud.channel.bulk_create(channels, category, guild)
+            stale_channel_ids = [db_channel['id'] for db_channel in await crud.channel.get_all_by_guild_discord_id(guild.id)
+                                 if not guild.get_channel(db_channel['discord_id'])]
+            await crud.channel.remove_many(stale_channel_ids)
+            snapshot = await get_deals_snapshot()
+            await self.deliver(guild, snapshot, db_channels)
+        except discord.errors.Forbidden:
+            logging.info(f'Leaving guild {guild.name} because of insufficient permissions')
+            await guild.leave()
+
+    async def deliver(self, guild: discord.Guild, snapshot: DealSnapshot, db_channels: List[Record]) -> bool:
+        """Send deals to the newly onboarded guild. If they have been delivered to every channel, record the delivery,
+        so the scheduler does not repeat it. Otherwise the scheduler still delivers them at the scheduled time.
+
+        :param guild: discord.py Guild class object.
+        :param snapshot: DealSnapshot class object containing deals to send.
+        :param db_channels: List of channels of the Guild from database.
+        :return: True if deals have been delivered to every channel, False otherwise.
+        """
+        delivered = await self.scheduled_tasks_cog.deals_task(guild, snapshot, db_channels)
+        if not delivered:
+            return False
+        db_guild = await crud.guild.get_by_discord_id(guild.id)
+        if db_guild:
+            await self.scheduled_tasks_cog.record_deliveries(db_guild)
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            guild = await self._queue.get()
+            try:
+                await self.onboard(guild)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception(f'Onboarding of guild {guild.name} failed')
+            finally:
+                self._pending.discard(guild.id)
+                self._queue.task_done()
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+import discord
+from asyncpg import Record
+from discord.ext import commands
+
+import crud
+from onboarding import Onboarding
+from tasks import ScheduledTasks
+
+
+class GuildRepairs:
+    """A class to collect changes in database found while reconciling guilds, so they are applied in batches.
+
+    Attributes
+    ----------
+    missing_guild_ids : List[int]
+        ids of guilds in database the bot is no longer a member of
+    found_guild_ids : List[int]
+        ids of guilds in database marked as missing, that the bot is a member of again
+    renamed_guilds : List[dict]
+        ids and new names of renamed guilds
+    new_categories : List[dict]
+        categories created in place of deleted ones
+    removed_category_ids : List[int]
+        ids of categories in database deleted in Discord
+    channels : List[dict]
+        ids and current attributes of renamed, moved and recreated channels
+    recreated_channel_ids : List[int]
+        ids of channels in database recreated in Discord, whose posted messages are gone
+    """
+
+    def __init__(self):
+        self.missing_guild_ids: List[int] = []
+        self.found_guild_ids: List[int] = []
+        self.renamed_guilds: List[dict] = []
+        self.new_categories: List[dict] = []
+        self.removed_category_ids: List[int] = []
+        self.channels: List[dict] = []
+        self.recreated_channel_ids: List[int] = []
+
+    def __str__(self) -> str:
+        return (f'{len(self.missing_guild_ids)} guilds missing, {len(self.found_guild_ids)} guilds found again, '
+                f'{len(self.renamed_guilds)} guilds renamed, '
+                f'{len(self.new_categories)} categories recreated, {len(self.channels)} channels updated, '
+                f'{len(self.recreated_channel_ids)} channels recreated')
+
+
+class Reconciliation(commands.Cog):
+    """Cog designed for bringing guilds, categories and channels in database in line with Discord.
+
+    Whole state is reconciled once at startup, so events missed while the bot was offline do not leave stale rows,
+    and a single guild is reconciled whenever one of its channels is deleted. Deleted category and channels
+    of the bot are created again, so deliveries never have to repair them. Guilds the bot is no longer a member of
+    are only marked as missing, since the guild cache may be incomplete at startup. They are deleted by the scheduler
+    once they have been missing for settings.MISSING_GUILD_RETENTION days.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot: commands.Bot = bot
+        self.scheduled_tasks_cog: ScheduledTasks = self.bot.get_cog('ScheduledTasks')
+        self.onboarding_cog: Onboarding = self.bot.get_cog('Onboarding')
+        self.reconciled = False
+        self._lock = asyncio.Lock()
+
+    async def reconcile(self) -> None:
+        """Compare all guilds handled by the shards of this process with database and apply the differences.
+        Guilds that are not in database are onboarded. Does nothing if it has already run in this process.
+
+        :return: None
+        """
+        async with self._lock:
+            if self.reconciled:
+                return
+            db_guilds = await crud.guild.get_all()
+            repairs = await self._diff_guilds(db_guilds)
+            await self._apply(repairs)
+            self.reconciled = True
+            logging.info(f'Reconciled database with Discord: {repairs}')
+
+        known_guild_ids = {db_guild['discord_id'] for db_guild in db_guilds}
+        for guild in self.bot.guilds:
+            if guild.id not in known_guild_ids and self.scheduled_tasks_cog.owns_guild(guild.id):
+                await self.onboarding_cog.submit(guild)
+
+    async def reconcile_guild(self, guild: discord.Guild) -> None:
+        """Compare category and channels of a single guild with database and apply the differences.
+
+        :param guild: discord.py Guild class object.
+        :return: None
+        """
+        async with self._lock:
+            db_guild = await crud.guild.get_by_discord_id(guild.id)
+            if not db_guild or guild.unavailable:
+                return
+            repairs = GuildRepairs()
+            await self._diff_guild(guild,
+                                   db_guild,
+                                   await crud.category.get_all_by_guild_id(db_guild['id']),
+                                   await crud.channel.get_all_by_guild_discord_id(guild.id),
+                                   repairs)
+            await self._apply(repairs)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        if not isinstance(channel, (discord.TextChannel, discord.CategoryChannel)):
+            return
+        if isinstance(channel, discord.TextChannel) and not await crud.channel.get_by_discord_id(channel.id):
+            return
+        await self.reconcile_guild(channel.guild)
+
+    async def _diff_guilds(self, db_guilds: List[Record]) -> GuildRepairs:
+        """Find differences between all guilds handled by the shards of this process in Discord and in database.
+        Guilds that are unavailable are skipped, guilds that are gone are marked as missing.
+        """
+        db_categories: Dict[int, List[Record]] = {}
+        for db_category in await crud.category.get_all():
+            db_categories.setdefault(db_category['guild_id'], []).append(db_category)
+        db_channels: Dict[int, List[Record]] = {}
+        for db_channel in await crud.channel.get_all():
+            db_channels.setdefault(db_channel['guild_id'], []).append(db_channel)
+
+        repairs = GuildRepairs()
+        for db_guild in db_guilds:
+            if not self.scheduled_tasks_cog.owns_guild(db_guild['discord_id']):
+                continue
+            guild = self.bot.get_guild(db_guild['discord_id'])
+            if guild is None:
+                if not db_guild['missing_since']:
+                    repairs.missing_guild_ids.append(db_guild['id'])
+                continue
+            if guild.unavailable:
+                continue
+            if db_guild['missing_since']:
+                repairs.found_guild_ids.append(db_guild['id'])
+            if guild.name != db_guild['name']:
+                repairs.renamed_guilds.append({'id': db_guild['id'], 'name': guild.name})
+            await self._diff_guild(guild,
+                                   db_guild,
+                                   db_categories.get(db_guild['id'], []),
+                                   db_channels.get(db_guild['id'], []),
+                                   repairs)
+        return repairs
+
+    async def _diff_guild(self,
+                          guild: discord.Guild,
+                          db_guild: Record,
+                          db_categories: List[Record],
+                          db_channels: List[Record],
+                          repairs: GuildRepairs) -> None:
+        """Find differences between category and channels of the guild in Discord and in database,
+        creating deleted ones in Discord again. Every change is added to repairs as soon as it is made in Discord,
+        so if the bot is not allowed to repair the guild completely, the next run picks up where this one stopped
+        instead of creating duplicates. Categories left from earlier runs are removed only once all channels
+        are moved out of them.
+        """
+        category, category_id = None, None
+        for db_category in db_categories:
+            category = guild.get_channel(db_category['discord_id'])
+            if category is not None:
+                category_id = db_category['id']
+                break
+        stale_category_ids = [db_category['id'] for db_category in db_categories if db_category['id'] != category_id]
+        try:
+            if category is None and db_categories:
+                category = await guild.create_category(name=db_categories[0]['name'])
+                repairs.new_categories.append({'discord_id': category.id,
+                                               'name': category.name,
+                                               'guild_id': db_guild['id'],
+                                               'guild_discord_id': db_guild['discord_id']})
+                await category.set_permissions(guild.me, send_messages=True)
+            for db_channel in db_channels:
+                channel = guild.get_channel(db_channel['discord_id'])
+                if channel is None:
+                    channel = await guild.create_text_channel(name=db_channel['name'], category=category)
+                    repairs.recreated_channel_ids.append(db_channel['id'])
+                elif category is not None and db_channel['category_id'] != category_id:
+                    await channel.edit(category=category)
+                elif channel.name == db_channel['name']:
+                    continue
+                repairs.channels.append({'id': db_channel['id'],
+                                         'discord_id': channel.id,
+                                         'name': channel.name,
+                                         'category_id': category_id,
+                                         'category_discord_id': category.id if category else None})
+        except discord.errors.Forbidden:
+            logging.warning(f'Insufficient permissions to repair channels in {guild}')
+            return
+        repairs.removed_category_ids.extend(stale_category_ids)
+
+    async def _apply(self, repairs: GuildRepairs) -> None:
+        async with crud.transaction():
+            now = datetime.now()
+            await crud.guild.update_many([{'id': id, 'missing_since': now} for id in repairs.missing_guild_ids])
+            await crud.guild.update_many([{'id': id, 'missing_since': None} for id in repairs.found_guild_ids])
+            await crud.guild.update_many(repairs.renamed_guilds)
+            db_categories = await crud.category.upsert_many(repairs.new_categories, index_elements=['discord_id'])
+            category_ids = {db_category['discord_id']: db_category['id'] for db_category in db_categories}
+            for channel_update in repairs.channels:
+                if channel_update['category_id'] is None and channel_update['category_discord_id'] is not None:
+                    channel_update['category_id'] = category_ids[channel_update['category_discord_id']]
+            await crud.channel.update_many(repairs.channels)
+            await crud.category.remove_many(repairs.removed_category_ids)
+            await crud.message.remove_by_channel_ids(repairs.recreated_channel_ids)
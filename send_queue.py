@@ -0,0 +1,132 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Tuple
+
+import settings
+
+# Limits of the Discord routes used for deliveries as (requests, seconds), tracked separately for every channel.
+ROUTE_LIMITS = {
+    'send': (5, 5.0),
+    'edit': (5, 5.0),
+    'delete': (1, 1.0),
+    'delete_message': (5, 1.0)
+}
+# Extra delay added to every window, so that requests delayed in transit do not end up in the same window
+# as the following ones on the Discord side.
+RATE_LIMIT_MARGIN = 0.25
+IDLE_BUCKETS_PRUNE_INTERVAL = 60
+
+
+class RateBucket:
+    """A class to pace requests, so that at most `rate` of them are sent within any `per` seconds.
+
+    Every request reserves its send time up front, so waiting requests are released in the order they came in.
+    """
+
+    def __init__(self, rate: int, per: float):
+        self.per = per + RATE_LIMIT_MARGIN
+        self._reserved = deque(maxlen=rate)
+
+    def reserve(self, now: float) -> float:
+        """Reserve the earliest send time that fits in the limit.
+
+        :param now: Current monotonic time.
+        :return: Monotonic time the request may be sent at.
+        """
+        send_at = now
+        if len(self._reserved) == self._reserved.maxlen:
+            send_at = max(now, self._reserved[0] + self.per)
+        self._reserved.append(send_at)
+        return send_at
+
+    def is_idle(self, now: float) -> bool:
+        return not self._reserved or self._reserved[-1] + self.per <= now
+
+
+class SendQueueStats:
+    """A class to track requests paced by the SendQueue.
+
+    Attributes
+    ----------
+    waiting : int
+        amount of requests currently waiting for their send time
+    max_waiting : int
+        highest amount of requests waiting at the same time
+    sent : int
+        amount of requests released
+    total_wait : float
+        total time the released requests have waited, in seconds
+    max_wait : float
+        longest time a single request has waited, in seconds
+    """
+
+    def __init__(self):
+        self.waiting = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.max_waiting = self.waiting
+        self.sent = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def __str__(self) -> str:
+        average_wait = self.total_wait / self.sent if self.sent else 0.0
+        return (f'{self.sent} requests sent (avg wait {average_wait:.2f}s, max wait {self.max_wait:.2f}s, '
+                f'max queue depth {self.max_waiting})')
+
+
+class SendQueue:
+    """Outbound scheduler of the requests to Discord made during deliveries.
+
+    Every request waits until it fits in the limit of its route in the channel and then in the global limit
+    of the bot, so the bot paces itself ahead of time instead of running into rate limits. Requests of a single
+    channel are sent one by one, so channels are interleaved in the global limit in the order they become ready.
+    Discord counts the global limit per bot token, so every process gets an equal share of it.
+    """
+
+    def __init__(self, global_rate: int = max(1, settings.SEND_GLOBAL_RATE // settings.SHARD_PROCESSES)):
+        self.stats = SendQueueStats()
+        self._global_bucket = RateBucket(global_rate, 1.0)
+        self._buckets: Dict[Tuple[str, int], RateBucket] = {}
+        self._pruned_at = time.monotonic()
+
+    async def acquire(self, route: str, channel_id: int) -> None:
+        """Wait until a request to given route in the channel can be sent.
+
+        :param route: One of the keys of ROUTE_LIMITS.
+        :param channel_id: ID of the channel in Discord.
+        :return: None
+        """
+        started_at = time.monotonic()
+        self.stats.waiting += 1
+        self.stats.max_waiting = max(self.stats.max_waiting, self.stats.waiting)
+        try:
+            await self._wait_until(self._get_bucket(route, channel_id).reserve(time.monotonic()))
+            await self._wait_until(self._global_bucket.reserve(time.monotonic()))
+        finally:
+            self.stats.waiting -= 1
+        wait = time.monotonic() - started_at
+        self.stats.sent += 1
+        self.stats.total_wait += wait
+        self.stats.max_wait = max(self.stats.max_wait, wait)
+
+    def _get_bucket(self, route: str, channel_id: int) -> RateBucket:
+        bucket = self._buckets.get((route, channel_id))
+        if bucket is None:
+            now = time.monotonic()
+            if now - self._pruned_at > IDLE_BUCKETS_PRUNE_INTERVAL:
+                self._buckets = {key: bucket for key, bucket in self._buckets.items() if not bucket.is_idle(now)}
+                self._pruned_at = now
+            bucket = self._buckets[(route, channel_id)] = RateBucket(*ROUTE_LIMITS[route])
+        return bucket
+
+    @staticmethod
+    async def _wait_until(send_at: float) -> None:
+        delay = send_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+send_queue = SendQueue()
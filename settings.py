@@ -1,10 +1,22 @@
-from decouple import config
+from decouple import Csv, config
 
 API_BASE_URL = config('API_BASE_URL')
 DATABASE_URL = config('DATABASE_URL')
 BOT_TOKEN = config('BOT_TOKEN')
 PREFIX = config('PREFIX')
 
+SHARD_COUNT = config('SHARD_COUNT', default=0, cast=int)
+SHARD_IDS = config('SHARD_IDS', default='', cast=Csv(int))
+if SHARD_IDS and not SHARD_COUNT:
+    raise ValueError('SHARD_COUNT must be set when SHARD_IDS is set')
+if any(not 0 <= shard_id < SHARD_COUNT for shard_id in SHARD_IDS):
+    raise ValueError(f'SHARD_IDS must be between 0 and SHARD_COUNT - 1 ({SHARD_COUNT - 1})')
+# Amount of processes running the bot with the same token, assuming the shards are split evenly between them.
+SHARD_PROCESSES = -(-SHARD_COUNT // len(SHARD_IDS)) if SHARD_IDS else 1
+
+API_PAGE_SIZE = 60
+API_MAX_CONCURRENT_PAGES = config('API_MAX_CONCURRENT_PAGES', default=4, cast=int)
+
 CATEGORY = config('CATEGORY')
 STEAM_CHANNEL = config('STEAM_CHANNEL')
 STEAM_AAA_CHANNEL = config('STEAM_AAA_CHANNEL')
@@ -13,26 +25,76 @@ GOG_CHANNEL = config('GOG_CHANNEL')
 GOG_AAA_CHANNEL = config('GOG_AAA_CHANNEL')
 GOG_DEALS_AMOUNT = int(config('GOG_DEALS_AMOUNT'))
 
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_STATEMENT_TIMEOUT = config('DB_STATEMENT_TIMEOUT', default=10000, cast=int)
+DB_COMMAND_TIMEOUT = config('DB_COMMAND_TIMEOUT', default=15, cast=float)
+DB_SLOW_QUERY_MS = config('DB_SLOW_QUERY_MS', default=250, cast=float)
+DB_STATS_INTERVAL = config('DB_STATS_INTERVAL', default=60, cast=int)
+
+HTTP_POOL_SIZE = config('HTTP_POOL_SIZE', default=100, cast=int)
+HTTP_POOL_SIZE_PER_HOST = config('HTTP_POOL_SIZE_PER_HOST', default=10, cast=int)
+HTTP_KEEPALIVE_TIMEOUT = config('HTTP_KEEPALIVE_TIMEOUT', default=30, cast=float)
+HTTP_DNS_CACHE_TTL = config('HTTP_DNS_CACHE_TTL', default=300, cast=int)
+HTTP_TIMEOUT = config('HTTP_TIMEOUT', default=30, cast=float)
+HTTP_CONNECT_TIMEOUT = config('HTTP_CONNECT_TIMEOUT', default=10, cast=float)
+
+DEALS_CACHE_TTL = config('DEALS_CACHE_TTL', default=300, cast=int)
+DEALS_CACHE_SIZE = config('DEALS_CACHE_SIZE', default=128, cast=int)
+EMBED_CACHE_SIZE = config('EMBED_CACHE_SIZE', default=4096, cast=int)
+
+RANDOM_POOL_SIZE = config('RANDOM_POOL_SIZE', default=1000, cast=int)
+RANDOM_POOL_REFRESH_INTERVAL = config('RANDOM_POOL_REFRESH_INTERVAL', default=30, cast=int)
+
+FLIPBOOK_TIMEOUT = config('FLIPBOOK_TIMEOUT', default=120, cast=int)
+FLIPBOOK_PAGES_CACHE_SIZE = config('FLIPBOOK_PAGES_CACHE_SIZE', default=64, cast=int)
+
+DELIVERY_WORKERS = config('DELIVERY_WORKERS', default=20, cast=int)
+DELIVERY_MAX_CHANNELS = config('DELIVERY_MAX_CHANNELS', default=40, cast=int)
+DELIVERY_MAX_CHANNELS_PER_GUILD = config('DELIVERY_MAX_CHANNELS_PER_GUILD', default=2, cast=int)
+DELIVERY_PROGRESS_INTERVAL = config('DELIVERY_PROGRESS_INTERVAL', default=100, cast=int)
+DELIVERY_CATCH_UP_WINDOW = config('DELIVERY_CATCH_UP_WINDOW', default=60, cast=int)
+DELIVERY_MAX_ATTEMPTS = config('DELIVERY_MAX_ATTEMPTS', default=3, cast=int)
+DELIVERY_LEDGER_RETENTION = config('DELIVERY_LEDGER_RETENTION', default=7, cast=int)
+DELIVERY_SHUTDOWN_TIMEOUT = config('DELIVERY_SHUTDOWN_TIMEOUT', default=20, cast=float)
+SNAPSHOT_RETENTION = config('SNAPSHOT_RETENTION', default=7, cast=int)
+MISSING_GUILD_RETENTION = config('MISSING_GUILD_RETENTION', default=7, cast=int)
+
+ONBOARDING_WORKERS = config('ONBOARDING_WORKERS', default=2, cast=int)
+ONBOARDING_QUEUE_SIZE = config('ONBOARDING_QUEUE_SIZE', default=100, cast=int)
+
+# Global limit of requests per second for the whole bot, shared evenly by all of its processes.
+SEND_GLOBAL_RATE = config('SEND_GLOBAL_RATE', default=45, cast=int)
+
+# Default for all channels, overridden per channel by STEAM_BATCH_EMBEDS, STEAM_AAA_BATCH_EMBEDS, GOG_BATCH_EMBEDS
+# and GOG_AAA_BATCH_EMBEDS.
+BATCH_EMBEDS = config('BATCH_EMBEDS', default=True, cast=bool)
+INCREMENTAL_REFRESH = config('INCREMENTAL_REFRESH', default=True, cast=bool)
+
 CHANNELS_SETTINGS = {
     STEAM_CHANNEL: {
         'min_retail_price': 0,
         'max_retail_price': 29,
-        'store': 'steam'
+        'store': 'steam',
+        'batch_embeds': config('STEAM_BATCH_EMBEDS', default=BATCH_EMBEDS, cast=bool)
     },
     STEAM_AAA_CHANNEL: {
         'min_retail_price': 29,
         'max_retail_price': 1000,
-        'store': 'steam'
+        'store': 'steam',
+        'batch_embeds': config('STEAM_AAA_BATCH_EMBEDS', default=BATCH_EMBEDS, cast=bool)
     },
     GOG_CHANNEL: {
         'min_retail_price': 0,
         'max_retail_price': 29,
-        'store': 'gog'
+        'store': 'gog',
+        'batch_embeds': config('GOG_BATCH_EMBEDS', default=BATCH_EMBEDS, cast=bool)
     },
     GOG_AAA_CHANNEL: {
         'min_retail_price': 29,
         'max_retail_price': 1000,
-        'store': 'gog'
+        'store': 'gog',
+        'batch_embeds': config('GOG_AAA_BATCH_EMBEDS', default=BATCH_EMBEDS, cast=bool)
     }
 }
 
@@ -1,7 +1,8 @@
 import asyncio
 import logging
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, List, Set, Tuple
 
 import discord
 from asyncpg import Record
@@ -9,109 +10,380 @@ from discord.ext import commands, tasks
 
 import crud
 import settings
-from deal import Deal, get_deals, get_embed_from_deal
+from deal import Deal, DealSnapshot, get_deals_snapshot, random_pool, render_deal_embed
+from delivery import DeliveryEngine
+from messaging import batch_embeds, build_payload, delete_messages, edit_payload, payload_digest, send_payload
+from utils import delivery_slots, get_channel_settings, guild_shard_id
 
 guilds__running_tasks: dict = {}
 
+UNKNOWN_MESSAGE = 10008
+
 
 class ScheduledTasks(commands.Cog):
     """Cog designed for tasks that are handled by the bot automatically.
     """
     def __init__(self, bot):
         self.bot: commands.Bot = bot
+        self.delivery = DeliveryEngine()
+        self.pending_deliveries: Set[Tuple[int, datetime]] = set()
+        self.ledger_started_at: datetime = None
         self.deals_schedule.start()
+        self.random_pool_refresh.start()
+        self.database_stats.start()
+
+    async def stop(self) -> None:
+        """Stop scheduling deliveries and wait up to settings.DELIVERY_SHUTDOWN_TIMEOUT seconds for the submitted ones
+        to finish. Deliveries that are still running afterwards are cancelled, they are caught up after the restart.
+
+        :return: None
+        """
+        self.deals_schedule.cancel()
+        try:
+            await asyncio.wait_for(self.delivery.join(), timeout=settings.DELIVERY_SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.warning(f'Cancelling deliveries still running at shutdown: {self.delivery.progress}')
+        await self.delivery.stop()
 
     @tasks.loop(minutes=1)
     async def deals_schedule(self):
-        """Every hour sends deals to every guild asynchronously which has this hour set up as a delivery hour.
+        """Every minute submits deals delivery to the delivery engine for every guild which has a delivery
+        scheduled within the last settings.DELIVERY_CATCH_UP_WINDOW minutes, that has not been delivered yet.
+        That way deliveries missed because of a restart or a delay of the loop are caught up.
+        Deliveries are recorded in database, each one is attempted at most settings.DELIVERY_MAX_ATTEMPTS times.
+        Only guilds handled by the shards of this process are delivered to.
+
+        Errors are logged instead of raised, so that a single failed tick does not stop the loop.
 
         :return: None
         """
-        if not datetime.now().minute == 0:
-            return
-        steam_deals_list = await get_deals(amount=settings.STEAM_DEALS_AMOUNT, store='steam')
-        gog_deals_list = await get_deals(amount=settings.GOG_DEALS_AMOUNT, store='gog')
-        coroutines = []
-        db_guilds = await crud.guild.get_all_by_filters(time=datetime.now().hour, auto=True)
-        if not db_guilds:
+        now = datetime.now().replace(second=0, microsecond=0)
+        if now.minute == 0:
+            try:
+                await self.prune(now)
+            except Exception:
+                logging.exception('Unable to prune delivery ledger, deal snapshots and missing guilds')
+        try:
+            await self.schedule_deliveries(now)
+        except Exception:
+            logging.exception('Unable to schedule deals delivery')
+
+    async def prune(self, now: datetime) -> None:
+        """Method that removes deliveries, deal snapshots and guilds of this process marked as missing,
+        that are older than their retention periods.
+
+        :param now: Current time.
+        :return: None
+        """
+        await crud.delivery.remove_older_than(now - timedelta(days=settings.DELIVERY_LEDGER_RETENTION))
+        await crud.deal.remove_snapshots_older_than(now - timedelta(days=settings.SNAPSHOT_RETENTION))
+        missing_guilds = await crud.guild.get_all_missing_before(now - timedelta(days=settings.MISSING_GUILD_RETENTION))
+        await crud.guild.remove_many([db_guild['id'] for db_guild in missing_guilds
+                                      if self.owns_guild(db_guild['discord_id'])])
+
+    async def schedule_deliveries(self, now: datetime) -> None:
+        """Method that submits every delivery due at given time, that has been neither delivered
+        nor attempted settings.DELIVERY_MAX_ATTEMPTS times, and is not running already.
+
+        :param now: Current time, rounded down to the minute.
+        :return: None
+        :raises NoDealsFound: When there are deliveries to submit, but no deals are found.
+        """
+        since = now - timedelta(minutes=settings.DELIVERY_CATCH_UP_WINDOW)
+        if self.ledger_started_at and self.ledger_started_at > since:
+            # Deliveries scheduled before the ledger existed are not recorded, so they would all be repeated.
+            since = self.ledger_started_at
+        due_deliveries = await self.get_due_deliveries(since, now)
+        if not due_deliveries:
             return
-        for db_guild in db_guilds:
-            db_guild = dict(db_guild)
+        settled = {(db_delivery['guild_id'], db_delivery['scheduled_for'])
+                   for db_delivery in await crud.delivery.get_all_settled_since(since, settings.DELIVERY_MAX_ATTEMPTS)}
+        snapshot = None
+        for db_guild, scheduled_for in due_deliveries:
+            key = (db_guild['id'], scheduled_for)
+            if key in settled or key in self.pending_deliveries:
+                continue
             guild = self.bot.get_guild(db_guild['discord_id'])
-            coroutines.append(self.deals_task(guild, steam_deals_list + gog_deals_list))
-        await asyncio.gather(*coroutines)
+            if not guild:
+                continue
+            if snapshot is None:
+                snapshot = await get_deals_snapshot()
+            self.pending_deliveries.add(key)
+            self.delivery.submit(guild.id, partial(self.scheduled_deals_task, guild, snapshot, db_guild, scheduled_for))
+        if snapshot is not None:
+            logging.info(f'Scheduled deals delivery: {self.delivery.progress}')
+
+    async def get_due_deliveries(self, since: datetime, until: datetime) -> List[Tuple[dict, datetime]]:
+        """Method that lists deliveries scheduled within given period for guilds with automatic delivery enabled.
+
+        It is called every minute, so it relies on the guilds being served from the configuration cache, loaded
+        in on_ready. Until the cache is loaded, every call costs one joined query per hour within the period.
+
+        :param since: Start of the period, exclusive.
+        :param until: End of the period, inclusive.
+        :return: List of tuples of the guild with its channels and the time the delivery is scheduled for.
+        """
+        hours = set()
+        hour_start = since.replace(minute=0)
+        while hour_start <= until:
+            hours.add(hour_start.hour)
+            hour_start += timedelta(hours=1)
+        due_deliveries = []
+        for hour in hours:
+            for db_guild in await crud.guild.get_all_due_with_channels(hour):
+                if not self.owns_guild(db_guild['discord_id']):
+                    continue
+                for scheduled_for in delivery_slots(db_guild['discord_id'], hour, since, until):
+                    due_deliveries.append((db_guild, scheduled_for))
+        return sorted(due_deliveries, key=lambda due_delivery: due_delivery[1])
+
+    async def record_deliveries(self, db_guild: Record) -> None:
+        """Method that marks deliveries of the guild scheduled within the catch-up window or later in the current
+        hour as delivered, so that a guild that has just received deals outside of the schedule does not get them
+        again from the scheduler.
+
+        :param db_guild: Guild from database.
+        :return: None
+        """
+        now = datetime.now()
+        since = now - timedelta(minutes=settings.DELIVERY_CATCH_UP_WINDOW)
+        until = now.replace(minute=59, second=0, microsecond=0)
+        for scheduled_for in delivery_slots(db_guild['discord_id'], db_guild['time'], since, until):
+            await crud.delivery.finish(db_guild['id'], scheduled_for, delivered=True)
+
+    def owns_guild(self, discord_id: int) -> bool:
+        """Check whether the Guild is handled by one of the shards run by this process.
+
+        :param discord_id: ID of the Guild in Discord.
+        :return: True if the Guild belongs to one of the shards of this process.
+        """
+        shard_count = self.bot.shard_count or 1
+        shard_ids = self.bot.shard_ids or range(shard_count)
+        return guild_shard_id(discord_id, shard_count) in shard_ids
 
     @deals_schedule.before_loop
     async def before_deals_schedule(self):
         await self.bot.wait_until_ready()
+        self.ledger_started_at = await crud.delivery.get_started_at()
+        self.delivery.start()
+
+    @tasks.loop(minutes=settings.RANDOM_POOL_REFRESH_INTERVAL)
+    async def random_pool_refresh(self):
+        """Periodically refreshes the pool of deals that the random command draws from.
+
+        :return: None
+        """
+        try:
+            await random_pool.refresh()
+        except Exception:
+            logging.exception('Unable to refresh random deals pool')
+
+    @random_pool_refresh.before_loop
+    async def before_random_pool_refresh(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(minutes=settings.DB_STATS_INTERVAL)
+    async def database_stats(self):
+        """Periodically logs latencies of database queries collected since the previous summary.
+
+        :return: None
+        """
+        for line in crud.database.report():
+            logging.info(f'Database queries, {line}')
+
+    @database_stats.before_loop
+    async def before_database_stats(self):
+        await self.bot.wait_until_ready()
 
     async def deals_task(self,
                          guild: discord.Guild,
-                         deals_list: List[Deal]):
+                         snapshot: DealSnapshot,
+                         db_channels: List[Record] = None):
         """Creates new task object and tries to send deals to every channel that is assigned to the Guild in database.
         After it's done, removes task object for the Guild.
 
         :param guild: discord.py Guild class object to send deals to.
-        :param deals_list: List of Deal dataclass objects.
-        :return: None
+        :param snapshot: DealSnapshot class object containing deals to send.
+        :param db_channels: List of channels of the Guild from database. If not provided, they are fetched.
+        :return: True if deals have been delivered to every channel, False otherwise.
         """
         if guild.id in guilds__running_tasks.keys():
             guilds__running_tasks[guild.id].append(self.deals_task.__name__)
         else:
             guilds__running_tasks[guild.id] = [self.deals_task.__name__]
 
+        delivered = False
         try:
-            db_channels = await crud.channel.get_all_by_guild_discord_id(guild.id)
-            await self.send_deals_to_channels(deals_list,
-                                              db_channels)
+            if db_channels is None:
+                db_channels = await crud.channel.get_all_by_guild_discord_id(guild.id)
+            channels_delivered = await self.send_deals_to_channels(snapshot,
+                                                                   db_channels)
+            delivered = all(channels_delivered.values())
 
         except discord.errors.Forbidden:
             logging.error(f'Insufficient permissions to send messages or bot has been removed from {guild}')
         guilds__running_tasks[guild.id].remove(self.deals_task.__name__)
+        return delivered
+
+    async def scheduled_deals_task(self,
+                                   guild: discord.Guild,
+                                   snapshot: DealSnapshot,
+                                   db_guild: dict,
+                                   scheduled_for: datetime):
+        """Runs deals task for the scheduled delivery and records the attempt and its result in database.
+
+        :param guild: discord.py Guild class object to send deals to.
+        :param snapshot: DealSnapshot class object containing deals to send.
+        :param db_guild: Guild from database together with its channels.
+        :param scheduled_for: Time the delivery has been scheduled for.
+        :return: None
+        """
+        delivered = False
+        try:
+            await crud.delivery.start(db_guild['id'], scheduled_for)
+            delivered = await self.deals_task(guild, snapshot, db_guild['channels'])
+        finally:
+            try:
+                await crud.delivery.finish(db_guild['id'], scheduled_for, delivered)
+            finally:
+                # Only after the result is recorded, otherwise the scheduler could submit the delivery again.
+                self.pending_deliveries.discard((db_guild['id'], scheduled_for))
 
     async def send_deals_to_channel(self,
                                     deals_list: List[Deal],
-                                    channel: discord.TextChannel):
+                                    channel: discord.TextChannel,
+                                    db_channel_id: int,
+                                    batch: bool = settings.BATCH_EMBEDS):
         """Method that sends deals to the channel specified.
 
-        :param deals_list: List of Deal dataclass objects.
+        If settings.INCREMENTAL_REFRESH is enabled and messages from the previous run are known,
+        only the messages that have changed are edited, appended or deleted.
+        Otherwise the channel is cleared and all messages are posted again.
+
+        :param deals_list: List of Deal class objects.
         :param channel: discord.py Channel class object.
-        :return: None
+        :param db_channel_id: id of the Channel in database.
+        :param batch: If True, sends multiple deals per message, otherwise sends each deal in a separate message.
+        :return: True if deals have been delivered, False if the channel has been deleted in the meantime.
         """
         if len(deals_list) == 0:
-            return
+            return True
+        embeds = [render_deal_embed(deal) for deal in deals_list]
+        embeds_batches = batch_embeds(embeds) if batch else [[embed] for embed in embeds]
+        payloads = [
+            build_payload(content=f"**Here's a list of {len(deals_list)} new :video_game: deals!**"),
+            build_payload(content=f"```Last updated: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')} UTC```"),
+            *(build_payload(embeds=embeds_batch) for embeds_batch in embeds_batches),
+            build_payload(content="```That's it for today :(```")
+        ]
+        async with self.delivery.channel_slot(channel.guild.id):
+            return await self._send_payloads_to_channel(payloads, channel, db_channel_id)
+
+    async def _send_payloads_to_channel(self,
+                                        payloads: List[dict],
+                                        channel: discord.TextChannel,
+                                        db_channel_id: int) -> bool:
         try:
-            await channel.purge()
-            await asyncio.sleep(1)  # This is due to the Discord sometimes not clearing the channel.
-            await channel.send(content=f"**Here's a list of {len(deals_list)} new :video_game: deals!**")
-            await channel.send(content=f"```Last updated: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')} UTC```")
-            for deal in deals_list:
-                await channel.send(embed=get_embed_from_deal(deal))
-            await channel.send(content="```That's it for today :(```")
+            if settings.INCREMENTAL_REFRESH and await self._refresh_channel(payloads, channel, db_channel_id):
+                return True
+            await self._repost_channel(payloads, channel, db_channel_id)
+            return True
         except discord.errors.NotFound:
             logging.error(f'Channel {channel.name} has been deleted while the bot was working on {channel.guild}')
-            new_channel = await channel.guild.create_text_channel(name=channel.name, category=channel.category)
-            await crud.channel.update_by_discord_id(channel.id, {'discord_id': new_channel.id,
-                                                                 'name': channel.name})
-            await self.send_deals_to_channel(deals_list, new_channel)
+            return False
+
+    async def _refresh_channel(self,
+                               payloads: List[dict],
+                               channel: discord.TextChannel,
+                               db_channel_id: int) -> bool:
+        """Edit, append or delete only the messages in the channel whose payload has changed since the last run.
+
+        :return: False if there are no messages known from the previous run or one of them is gone, True otherwise.
+        """
+        db_messages = await crud.message.get_all_by_channel_id(db_channel_id)
+        if not db_messages:
+            return False
+        new_messages = []
+        try:
+            for position, payload in enumerate(payloads):
+                digest = payload_digest(payload)
+                if position < len(db_messages):
+                    db_message = db_messages[position]
+                    if db_message['digest'] != digest:
+                        await edit_payload(channel, db_message['discord_id'], payload)
+                        await crud.message.update(db_message['id'], {'digest': digest})
+                else:
+                    message_id = await send_payload(channel, payload)
+                    new_messages.append({'discord_id': message_id,
+                                         'channel_id': db_channel_id,
+                                         'position': position,
+                                         'digest': digest})
+        except discord.errors.NotFound as error:
+            if error.code != UNKNOWN_MESSAGE:
+                raise
+            return False
+        await crud.message.bulk_create(new_messages)
+        stale_message_ids = [db_message['discord_id'] for db_message in db_messages[len(payloads):]]
+        if stale_message_ids:
+            await delete_messages(channel, stale_message_ids)
+            await crud.message.remove_by_discord_ids(stale_message_ids)
+        return True
+
+    async def _repost_channel(self,
+                              payloads: List[dict],
+                              channel: discord.TextChannel,
+                              db_channel_id: int):
+        """Clear the channel and post all messages again.
+        Messages known from the previous run are deleted by their IDs, the channel history is only read
+        when there are none. Either way the messages are deleted through the send queue.
+        """
+        db_messages = await crud.message.get_all_by_channel_id(db_channel_id)
+        if db_messages:
+            message_ids = [db_message['discord_id'] for db_message in db_messages]
+        else:
+            message_ids = [message.id for message in await channel.history(limit=None).flatten()]
+        await delete_messages(channel, message_ids)
+        await crud.message.remove_by_channel_id(db_channel_id)
+        new_messages = []
+        for position, payload in enumerate(payloads):
+            message_id = await send_payload(channel, payload)
+            new_messages.append({'discord_id': message_id,
+                                 'channel_id': db_channel_id,
+                                 'position': position,
+                                 'digest': payload_digest(payload)})
+        await crud.message.bulk_create(new_messages)
 
     async def send_deals_to_channels(self,
-                                     deals_list: List[Deal],
-                                     db_channels: List[Record]):
-        """Method that takes list of channels from database, filters the deals basing on fields
-        (minimum and maximum retail price) in database for each channel, and sends the filtered deals to all channels
+                                     snapshot: DealSnapshot,
+                                     db_channels: List[Record]) -> Dict[int, bool]:
+        """Method that takes list of channels from database, picks the deals from snapshot basing on fields
+        (store, minimum and maximum retail price) in database for each channel, and sends them to all channels
         asynchronously.
 
-        :param deals_list: List od Deal dataclass objects.
+        :param snapshot: DealSnapshot class object containing deals to send.
         :param db_channels: List of channels gathered from database.
-        :return: None
+        :return: Dict telling for id of every channel in database whether deals have been delivered to it.
         """
+        delivered = {}
         coroutines = []
+        channel_ids = []
         for db_channel in db_channels:
             db_channel = dict(db_channel)
             channel = self.bot.get_channel(db_channel['discord_id'])
-            filtered_deals = [deal for deal in deals_list
-                              if deal.store_id == settings.STORES_MAPPING[db_channel['store']]
-                              and db_channel['min_retail_price'] < deal.normal_price <= db_channel['max_retail_price']]
-            coroutines.append(self.send_deals_to_channel(filtered_deals, channel))
-        await asyncio.gather(*coroutines)
+            if channel is None:
+                logging.warning(f"Channel {db_channel['name']} is missing, skipping it until it is reconciled")
+                delivered[db_channel['id']] = False
+                continue
+            filtered_deals = snapshot.get_deals(db_channel['store'],
+                                                db_channel['min_retail_price'],
+                                                db_channel['max_retail_price'])
+            channel_settings = get_channel_settings(db_channel['store'],
+                                                    db_channel['min_retail_price'],
+                                                    db_channel['max_retail_price'])
+            coroutines.append(self.send_deals_to_channel(filtered_deals,
+                                                         channel,
+                                                         db_channel['id'],
+                                                         channel_settings.get('batch_embeds', settings.BATCH_EMBEDS)))
+            channel_ids.append(db_channel['id'])
+        delivered.update(zip(channel_ids, await asyncio.gather(*coroutines)))
+        return delivered
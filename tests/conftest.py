@@ -0,0 +1,117 @@
+"""Test configuration.
+
+Tests cover the pure logic of the bot, so packages that are only used to talk to Discord, the API or the database
+are replaced with stubs when they are not installed, and settings are read from the environment defaults below.
+"""
+import importlib.util
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENVIRONMENT = {
+    'API_BASE_URL': 'https://www.cheapshark.com/api/1.0/',
+    'DATABASE_URL': 'sqlite://',
+    'BOT_TOKEN': 'token',
+    'PREFIX': '!gd ',
+    'CATEGORY': 'GAME DEALS',
+    'STEAM_CHANNEL': 'steam-deals',
+    'STEAM_AAA_CHANNEL': 'steam-aaa-deals',
+    'STEAM_DEALS_AMOUNT': '100',
+    'GOG_CHANNEL': 'gog-deals',
+    'GOG_AAA_CHANNEL': 'gog-aaa-deals',
+    'GOG_DEALS_AMOUNT': '100'
+}
+STUBBED_PACKAGES = {
+    'aiohttp': [],
+    'asyncpg': [],
+    'databases': [],
+    'discord': ['errors', 'ext', 'ext.commands', 'ext.tasks', 'http', 'utils']
+}
+
+
+class _StubType(type):
+    """Metaclass of stubbed classes, every missing attribute is another stubbed class."""
+
+    def __getattr__(cls, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        attribute = _StubType(name, (_Stub,), {})
+        setattr(cls, name, attribute)
+        return attribute
+
+
+class _Stub(metaclass=_StubType):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return _Decorated(args[0])
+        return _Stub()
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _Stub()
+
+
+class _Decorated(_Stub):
+    """Result of a stubbed decorator, such as tasks.loop(), keeping the decorated function as coro."""
+
+    def __init__(self, coro):
+        self.coro = coro
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        attribute = _StubType(name, (_Stub,), {})
+        setattr(self, name, attribute)
+        return attribute
+
+
+def _install_stubs() -> None:
+    for package, submodules in STUBBED_PACKAGES.items():
+        if importlib.util.find_spec(package) is not None:
+            continue
+        sys.modules[package] = _StubModule(package)
+        for submodule in submodules:
+            module = sys.modules[f'{package}.{submodule}'] = _StubModule(f'{package}.{submodule}')
+            parent, _, name = f'{package}.{submodule}'.rpartition('.')
+            setattr(sys.modules[parent], name, module)
+
+
+def _install_decouple() -> None:
+    if importlib.util.find_spec('decouple') is not None:
+        return
+
+    undefined = object()
+
+    def config(name, default=undefined, cast=lambda value: value):
+        value = os.environ.get(name, default)
+        if value is undefined:
+            raise KeyError(name)
+        if cast is bool:
+            return str(value).lower() in ('1', 'true', 'yes', 'on')
+        return cast(value)
+
+    class Csv:
+        def __init__(self, cast=str):
+            self.cast = cast
+
+        def __call__(self, value):
+            return [self.cast(item.strip()) for item in value.split(',') if item.strip()]
+
+    decouple = types.ModuleType('decouple')
+    decouple.config = config
+    decouple.Csv = Csv
+    sys.modules['decouple'] = decouple
+
+
+for variable, value in ENVIRONMENT.items():
+    os.environ.setdefault(variable, value)
+_install_stubs()
+_install_decouple()
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_get_returns_stored_value(clock):
+    deals_cache = TTLCache(ttl=10, maxsize=2)
+    deals_cache.set('key', 'value')
+    assert deals_cache.get('key') == 'value'
+
+
+def test_get_raises_for_expired_entry(clock):
+    deals_cache = TTLCache(ttl=10, maxsize=2)
+    deals_cache.set('key', 'value')
+    clock[0] += 10
+    with pytest.raises(KeyError):
+        deals_cache.get('key')
+    assert len(deals_cache) == 0
+
+
+def test_set_evicts_least_recently_used_entry(clock):
+    deals_cache = TTLCache(ttl=10, maxsize=2)
+    deals_cache.set('a', 1)
+    deals_cache.set('b', 2)
+    deals_cache.get('a')
+    deals_cache.set('c', 3)
+    assert deals_cache.get('a') == 1
+    assert deals_cache.get('c') == 3
+    with pytest.raises(KeyError):
+        deals_cache.get('b')
+
+
+def test_invalidate_removes_one_or_all_entries(clock):
+    deals_cache = TTLCache(ttl=10, maxsize=3)
+    deals_cache.set('a', 1)
+    deals_cache.set('b', 2)
+    deals_cache.invalidate('a')
+    assert len(deals_cache) == 1
+    deals_cache.invalidate()
+    assert len(deals_cache) == 0
+
+
+def test_get_or_fetch_shares_one_fetch_between_concurrent_callers():
+    deals_cache = TTLCache(ttl=10, maxsize=2)
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return 'value'
+
+    async def main():
+        return await asyncio.gather(*(deals_cache.get_or_fetch('key', fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ['value'] * 5
+    assert len(calls) == 1
+    assert deals_cache.get('key') == 'value'
+
+
+def test_get_or_fetch_does_not_store_failed_fetch():
+    deals_cache = TTLCache(ttl=10, maxsize=2)
+
+    async def fetch():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        asyncio.run(deals_cache.get_or_fetch('key', fetch))
+    assert len(deals_cache) == 0
@@ -0,0 +1,136 @@
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+
+import pytest
+
+import crud.base
+import crud.cache
+from crud.base import transaction, write_to_cache
+from crud.cache import ConfigCache
+
+
+def make_guild(id: int, time: int = 12, **attributes) -> dict:
+    return {'id': id, 'discord_id': 1000 + id, 'name': f'guild-{id}', 'auto': True, 'time': time,
+            'missing_since': None, **attributes}
+
+
+def make_channel(id: int, guild: dict) -> dict:
+    return {'id': id, 'discord_id': 2000 + id, 'name': f'channel-{id}', 'guild_id': guild['id'],
+            'guild_discord_id': guild['discord_id'], 'category_id': None, 'category_discord_id': None,
+            'min_retail_price': 0, 'max_retail_price': 29, 'store': 'steam'}
+
+
+class FakeDatabase:
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.on_fetch = {}
+
+    async def fetch_all(self, query):
+        table = query.froms[0].name
+        rows = list(self.rows.get(table, []))
+        if table in self.on_fetch:
+            self.on_fetch.pop(table)()
+        return rows
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+def test_update_guild_moves_it_between_hours():
+    config_cache = ConfigCache()
+    config_cache.put_guild(make_guild(1, time=12))
+    config_cache.update_guild(config_cache.get_guild_by_id(1), {'time': 18})
+    assert config_cache.get_guilds_by_hour(12) == []
+    assert [db_guild['id'] for db_guild in config_cache.get_guilds_by_hour(18)] == [1]
+    assert config_cache.get_guild(1001)['time'] == 18
+
+
+def test_remove_guild_removes_its_channels():
+    config_cache = ConfigCache()
+    guild, other_guild = make_guild(1), make_guild(2)
+    config_cache.put_guild(guild)
+    config_cache.put_guild(other_guild)
+    config_cache.put_channel(make_channel(1, guild))
+    config_cache.put_channel(make_channel(2, other_guild))
+    config_cache.remove_guild(config_cache.get_guild_by_id(1))
+    assert config_cache.get_guild(1001) is None
+    assert config_cache.get_guilds_by_hour(12) == [other_guild]
+    assert config_cache.get_channel_by_id(1) is None
+    assert config_cache.get_channels_by_guild(1001) == []
+    assert config_cache.get_channel_by_id(2) is not None
+
+
+def test_load_replaces_content(monkeypatch):
+    guild = make_guild(1)
+    monkeypatch.setattr(crud.cache, 'database', FakeDatabase({'guild': [guild], 'channel': [make_channel(1, guild)]}))
+    config_cache = ConfigCache()
+    config_cache.put_guild(make_guild(2))
+    asyncio.run(config_cache.load())
+    assert config_cache.loaded
+    assert config_cache.get_guild_by_id(2) is None
+    assert config_cache.get_guild_by_id(1) == guild
+    assert [db_channel['id'] for db_channel in config_cache.get_channels_by_guild(1001)] == [1]
+
+
+def test_load_keeps_writes_made_while_loading(monkeypatch):
+    database = FakeDatabase({'guild': [make_guild(1)]})
+    monkeypatch.setattr(crud.cache, 'database', database)
+    config_cache = ConfigCache()
+    new_guild = make_guild(2)
+
+    def write():
+        database.rows['guild'].append(new_guild)
+        config_cache.put_guild(new_guild)
+
+    # Guilds have already been fetched when the write is made.
+    database.on_fetch['channel'] = write
+    asyncio.run(config_cache.load())
+    assert config_cache.get_guild_by_id(2) == new_guild
+
+
+@pytest.fixture
+def config_cache(monkeypatch):
+    monkeypatch.setattr(crud.base, 'database', FakeDatabase())
+    return ConfigCache()
+
+
+def test_transaction_applies_cache_writes_after_commit(config_cache):
+    async def main():
+        async with transaction():
+            write_to_cache(partial(config_cache.put_guild, make_guild(1)))
+            assert config_cache.get_guild_by_id(1) is None
+
+    asyncio.run(main())
+    assert config_cache.get_guild_by_id(1) is not None
+
+
+def test_transaction_discards_cache_writes_on_rollback(config_cache):
+    async def main():
+        async with transaction():
+            write_to_cache(partial(config_cache.put_guild, make_guild(1)))
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+    assert config_cache.get_guild_by_id(1) is None
+
+
+def test_nested_transaction_discards_only_its_own_writes(config_cache):
+    async def main():
+        async with transaction():
+            write_to_cache(partial(config_cache.put_guild, make_guild(1)))
+            with pytest.raises(RuntimeError):
+                async with transaction():
+                    write_to_cache(partial(config_cache.put_guild, make_guild(2)))
+                    raise RuntimeError
+
+    asyncio.run(main())
+    assert config_cache.get_guild_by_id(1) is not None
+    assert config_cache.get_guild_by_id(2) is None
+
+
+def test_write_outside_transaction_is_applied_at_once(config_cache):
+    write_to_cache(partial(config_cache.put_guild, make_guild(1)))
+    assert config_cache.get_guild_by_id(1) is not None
@@ -0,0 +1,60 @@
+import numpy as np
+
+from deal import Deal, DealBatch
+
+DEALS = [
+    Deal(deal_id='a', store_id='1', sale_price=5.0, normal_price=20.0, saved_percentage=75,
+         metacritic_score='80', steam_reviews_percent='90'),
+    Deal(deal_id='b', store_id='7', sale_price=15.0, normal_price=30.0, saved_percentage=50,
+         metacritic_score='0', steam_reviews_percent=None),
+    Deal(deal_id='c', store_id='1', sale_price=40.0, normal_price=60.0, saved_percentage=33,
+         metacritic_score='', steam_reviews_percent='70'),
+    Deal(deal_id='d', store_id='1', sale_price=10.0, normal_price=29.0, saved_percentage=66,
+         metacritic_score='90', steam_reviews_percent='95'),
+]
+
+
+def deal_ids(deals_list):
+    return [deal.deal_id for deal in deals_list]
+
+
+def test_mask_without_filters_matches_all_deals():
+    assert DealBatch(DEALS).mask().all()
+
+
+def test_query_filters_by_store():
+    assert deal_ids(DealBatch(DEALS).query(store_ids=['7'])) == ['b']
+    assert deal_ids(DealBatch(DEALS).query(store_ids=['1', '7'])) == ['a', 'b', 'c', 'd']
+
+
+def test_query_filters_by_retail_price_band():
+    batch = DealBatch(DEALS)
+    assert deal_ids(batch.query(min_retail_price=0, max_retail_price=29)) == ['a', 'd']
+    assert deal_ids(batch.query(min_retail_price=29, max_retail_price=1000)) == ['b', 'c']
+
+
+def test_query_filters_by_sale_price():
+    assert deal_ids(DealBatch(DEALS).query(min_price=10, max_price=15)) == ['b', 'd']
+
+
+def test_missing_ratings_never_match_minimum_bounds():
+    batch = DealBatch(DEALS)
+    assert deal_ids(batch.query(min_metacritic_score=0)) == ['a', 'b', 'd']
+    assert deal_ids(batch.query(min_steam_rating=0)) == ['a', 'c', 'd']
+
+
+def test_query_ranks_and_trims():
+    batch = DealBatch(DEALS)
+    assert deal_ids(batch.query(order_by=['saved_percentage'], amount=2)) == ['a', 'd']
+    assert deal_ids(batch.query(weights={'saved_percentage': 1, 'steam_reviews_percent': 1})) == ['a', 'd', 'c', 'b']
+
+
+def test_rank_keeps_order_without_keys():
+    indices = np.array([3, 1, 2])
+    assert list(DealBatch(DEALS).rank(indices)) == [3, 1, 2]
+
+
+def test_empty_batch():
+    batch = DealBatch([])
+    assert len(batch) == 0
+    assert batch.query(store_ids=['1'], min_price=0) == []
@@ -0,0 +1,43 @@
+from messaging import MAX_EMBEDS_LENGTH, MAX_EMBEDS_PER_MESSAGE, batch_embeds, embed_length, payload_digest
+
+
+def make_embed(length: int) -> dict:
+    return {'title': 'x' * length, 'url': 'https://store.steampowered.com'}
+
+
+def test_embed_length_counts_texts_only():
+    embed = {'title': 'abc',
+             'description': 'de',
+             'url': 'https://www.cheapshark.com',
+             'footer': {'text': 'f', 'icon_url': 'https://www.cheapshark.com/img/logo.png'},
+             'author': {'name': 'gh'},
+             'fields': [{'name': 'i', 'value': 'jk'}]}
+    assert embed_length(embed) == 11
+
+
+def test_batch_embeds_limits_embeds_per_message():
+    embeds = [make_embed(10) for _ in range(MAX_EMBEDS_PER_MESSAGE * 2 + 1)]
+    batches = batch_embeds(embeds)
+    assert [len(batch) for batch in batches] == [MAX_EMBEDS_PER_MESSAGE, MAX_EMBEDS_PER_MESSAGE, 1]
+
+
+def test_batch_embeds_limits_total_length():
+    embeds = [make_embed(MAX_EMBEDS_LENGTH // 2) for _ in range(3)]
+    embeds.append(make_embed(1))
+    batches = batch_embeds(embeds)
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert all(sum(embed_length(embed) for embed in batch) <= MAX_EMBEDS_LENGTH for batch in batches)
+
+
+def test_batch_embeds_keeps_order():
+    embeds = [make_embed(length) for length in range(1, 25)]
+    assert [embed for batch in batch_embeds(embeds) for embed in batch] == embeds
+
+
+def test_batch_embeds_of_no_embeds():
+    assert batch_embeds([]) == []
+
+
+def test_payload_digest_ignores_key_order():
+    assert payload_digest({'content': None, 'embeds': []}) == payload_digest({'embeds': [], 'content': None})
+    assert payload_digest({'content': 'a'}) != payload_digest({'content': 'b'})
@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+
+import pytest
+
+from database import migrations
+from database.migrations import DELIVERY_LEDGER_VERSION, MIGRATIONS, MIGRATIONS_LOCK_ID, migrate, run_migrations
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def execute(self, statement, **params):
+        sql = str(statement)
+        self.engine.executed.append((sql, params))
+        if sql.startswith('INSERT INTO schema_version'):
+            self.engine.applied_versions.append(params['version'])
+        if sql == 'SELECT version FROM schema_version':
+            return [(version,) for version in self.engine.applied_versions]
+        if self.engine.fail_on and self.engine.fail_on in sql:
+            raise RuntimeError(sql)
+        return []
+
+
+class FakeEngine:
+    def __init__(self, applied_versions=(), fail_on=None):
+        self.applied_versions = list(applied_versions)
+        self.fail_on = fail_on
+        self.executed = []
+        self.disposed = False
+
+    @contextmanager
+    def begin(self):
+        yield FakeConnection(self)
+
+    @contextmanager
+    def connect(self):
+        yield FakeConnection(self)
+
+    def dispose(self):
+        self.disposed = True
+
+    def statements(self):
+        return [sql for sql, _ in self.executed]
+
+
+@pytest.fixture(autouse=True)
+def create_all(monkeypatch):
+    calls = []
+    monkeypatch.setattr(migrations.Base.metadata, 'create_all', lambda engine: calls.append(engine))
+    return calls
+
+
+def test_migration_versions_are_unique_and_ascending():
+    versions = [version for version, _, _ in MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert DELIVERY_LEDGER_VERSION in versions
+
+
+def test_run_migrations_applies_all_migrations_in_order():
+    engine = FakeEngine()
+    run_migrations(engine)
+    assert engine.applied_versions == [version for version, _, _ in MIGRATIONS]
+    for _, _, statements in MIGRATIONS:
+        assert all(statement in engine.statements() for statement in statements)
+
+
+def test_run_migrations_skips_applied_migrations():
+    engine = FakeEngine(applied_versions=[1, 2])
+    run_migrations(engine)
+    assert engine.applied_versions == [1, 2] + [version for version, _, _ in MIGRATIONS if version > 2]
+    assert MIGRATIONS[0][2][0] not in engine.statements()
+
+
+def test_run_migrations_does_nothing_when_up_to_date():
+    engine = FakeEngine(applied_versions=[version for version, _, _ in MIGRATIONS])
+    run_migrations(engine)
+    assert not any(sql.startswith('INSERT') for sql in engine.statements())
+
+
+def test_migrate_runs_under_advisory_lock(create_all):
+    engine = FakeEngine()
+    migrate(engine)
+    statements = engine.statements()
+    assert statements[0] == 'SELECT pg_advisory_lock(:lock_id)'
+    assert statements[-1] == 'SELECT pg_advisory_unlock(:lock_id)'
+    assert engine.executed[0][1] == {'lock_id': MIGRATIONS_LOCK_ID}
+    assert create_all == [engine]
+    assert engine.disposed
+
+
+def test_migrate_releases_lock_when_migration_fails():
+    engine = FakeEngine(fail_on='ALTER TABLE')
+    with pytest.raises(RuntimeError):
+        migrate(engine)
+    assert engine.statements()[-1] == 'SELECT pg_advisory_unlock(:lock_id)'
@@ -0,0 +1,215 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import crud
+import settings
+import tasks
+from onboarding import Onboarding
+from tasks import ScheduledTasks
+from utils import delivery_minute
+
+GUILD = {'id': 1, 'discord_id': 773196224975077437, 'name': 'guild', 'auto': True, 'time': 12,
+         'missing_since': None, 'channels': []}
+SLOT = datetime(2021, 1, 10, 12, delivery_minute(GUILD['discord_id']))
+
+
+class FakeGuild:
+    def __init__(self, id: int):
+        self.id = id
+        self.name = 'guild'
+
+
+class FakeBot:
+    def __init__(self, shard_count: int = None, shard_ids: list = None):
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self.cogs = {}
+
+    def get_guild(self, id: int) -> FakeGuild:
+        return FakeGuild(id) if id == GUILD['discord_id'] else None
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+
+class FakeLedger:
+    """In-memory replacement of crud.delivery, with the same semantics as the queries."""
+
+    def __init__(self):
+        self.deliveries = {}
+
+    async def get_all_settled_since(self, since, max_attempts):
+        return [{'guild_id': guild_id, 'scheduled_for': scheduled_for, **delivery}
+                for (guild_id, scheduled_for), delivery in self.deliveries.items()
+                if scheduled_for > since and (delivery['status'] == 'delivered' or delivery['attempts'] >= max_attempts)]
+
+    async def start(self, guild_id, scheduled_for):
+        delivery = self.deliveries.setdefault((guild_id, scheduled_for), {'status': 'pending', 'attempts': 0})
+        delivery['status'] = 'pending'
+        delivery['attempts'] += 1
+
+    async def finish(self, guild_id, scheduled_for, delivered):
+        delivery = self.deliveries.setdefault((guild_id, scheduled_for), {'attempts': 1})
+        delivery['status'] = 'delivered' if delivered else 'failed'
+
+
+class FakeDeliveryEngine:
+    def __init__(self):
+        self.submitted = []
+        self.progress = 'progress'
+
+    def submit(self, guild_id, delivery):
+        self.submitted.append(delivery)
+
+    async def run_all(self):
+        submitted, self.submitted = self.submitted, []
+        for delivery in submitted:
+            await delivery()
+        return len(submitted)
+
+
+class Scheduler:
+    """Scheduled tasks cog wired to fake CRUD, delivery engine and clock."""
+
+    def __init__(self, monkeypatch, bot: FakeBot = None, delivered: bool = True):
+        self.ledger = FakeLedger()
+        self.delivered = delivered
+        self.deals_tasks = 0
+        self.cog = ScheduledTasks(bot or FakeBot())
+        self.cog.delivery = FakeDeliveryEngine()
+
+        async def get_all_due_with_channels(hour):
+            return [GUILD] if hour == GUILD['time'] else []
+
+        async def get_deals_snapshot():
+            return 'snapshot'
+
+        async def deals_task(guild, snapshot, db_channels=None):
+            self.deals_tasks += 1
+            return self.delivered
+
+        monkeypatch.setattr(crud, 'delivery', self.ledger)
+        monkeypatch.setattr(crud.guild, 'get_all_due_with_channels', get_all_due_with_channels)
+        monkeypatch.setattr(tasks, 'get_deals_snapshot', get_deals_snapshot)
+        monkeypatch.setattr(self.cog, 'deals_task', deals_task)
+
+    def tick(self, now: datetime) -> int:
+        """Run one tick of the schedule at given time and return amount of submitted deliveries."""
+        asyncio.run(self.cog.schedule_deliveries(now))
+        return len(self.cog.delivery.submitted)
+
+    def run_deliveries(self) -> int:
+        return asyncio.run(self.cog.delivery.run_all())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [SLOT]
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0]
+
+    monkeypatch.setattr(tasks, 'datetime', FakeDatetime)
+    return now
+
+
+def test_due_delivery_is_submitted_once(monkeypatch):
+    scheduler = Scheduler(monkeypatch)
+    assert scheduler.tick(SLOT - timedelta(minutes=1)) == 0
+    assert scheduler.tick(SLOT) == 1
+    assert scheduler.tick(SLOT) == 1
+    scheduler.run_deliveries()
+    assert scheduler.ledger.deliveries[(GUILD['id'], SLOT)] == {'status': 'delivered', 'attempts': 1}
+    assert scheduler.tick(SLOT + timedelta(minutes=1)) == 0
+
+
+def test_missed_delivery_is_caught_up_after_restart(monkeypatch):
+    scheduler = Scheduler(monkeypatch)
+    assert scheduler.tick(SLOT + timedelta(minutes=settings.DELIVERY_CATCH_UP_WINDOW - 1)) == 1
+    scheduler.run_deliveries()
+    assert scheduler.ledger.deliveries[(GUILD['id'], SLOT)]['status'] == 'delivered'
+
+
+def test_delivery_outside_catch_up_window_is_not_caught_up(monkeypatch):
+    scheduler = Scheduler(monkeypatch)
+    assert scheduler.tick(SLOT + timedelta(minutes=settings.DELIVERY_CATCH_UP_WINDOW)) == 0
+
+
+def test_delivery_scheduled_before_ledger_start_is_not_caught_up(monkeypatch):
+    scheduler = Scheduler(monkeypatch)
+    scheduler.cog.ledger_started_at = SLOT + timedelta(minutes=1)
+    assert scheduler.tick(SLOT + timedelta(minutes=5)) == 0
+
+
+def test_failed_delivery_is_retried_up_to_max_attempts(monkeypatch):
+    scheduler = Scheduler(monkeypatch, delivered=False)
+    now = SLOT
+    for _ in range(settings.DELIVERY_MAX_ATTEMPTS + 2):
+        scheduler.tick(now)
+        scheduler.run_deliveries()
+        now += timedelta(minutes=1)
+    assert scheduler.deals_tasks == settings.DELIVERY_MAX_ATTEMPTS
+    expected = {'status': 'failed', 'attempts': settings.DELIVERY_MAX_ATTEMPTS}
+    assert scheduler.ledger.deliveries[(GUILD['id'], SLOT)] == expected
+
+
+def test_delivery_that_raises_is_recorded_as_failed(monkeypatch):
+    scheduler = Scheduler(monkeypatch)
+
+    async def deals_task(guild, snapshot, db_channels=None):
+        raise RuntimeError
+
+    monkeypatch.setattr(scheduler.cog, 'deals_task', deals_task)
+    scheduler.tick(SLOT)
+    with pytest.raises(RuntimeError):
+        scheduler.run_deliveries()
+    assert scheduler.ledger.deliveries[(GUILD['id'], SLOT)]['status'] == 'failed'
+    assert scheduler.cog.pending_deliveries == set()
+
+
+def test_guild_of_other_process_is_skipped(monkeypatch):
+    shard_id = (GUILD['discord_id'] >> 22) % 2
+    assert Scheduler(monkeypatch, bot=FakeBot(shard_count=2, shard_ids=[1 - shard_id])).tick(SLOT) == 0
+    assert Scheduler(monkeypatch, bot=FakeBot(shard_count=2, shard_ids=[shard_id])).tick(SLOT) == 1
+
+
+def test_failed_tick_does_not_stop_the_schedule(monkeypatch, clock):
+    scheduler = Scheduler(monkeypatch)
+
+    async def schedule_deliveries(now):
+        raise RuntimeError
+
+    monkeypatch.setattr(scheduler.cog, 'schedule_deliveries', schedule_deliveries)
+    asyncio.run(ScheduledTasks.deals_schedule.coro(scheduler.cog))
+
+
+def join(monkeypatch, scheduler: Scheduler) -> bool:
+    bot = FakeBot()
+    bot.cogs['ScheduledTasks'] = scheduler.cog
+    onboarding = Onboarding(bot)
+
+    async def get_by_discord_id(discord_id):
+        return GUILD
+
+    monkeypatch.setattr(crud.guild, 'get_by_discord_id', get_by_discord_id)
+    return asyncio.run(onboarding.deliver(FakeGuild(GUILD['discord_id']), 'snapshot', []))
+
+
+def test_join_delivery_is_not_repeated_by_the_schedule(monkeypatch, clock):
+    scheduler = Scheduler(monkeypatch)
+    clock[0] = SLOT - timedelta(minutes=2)
+    assert join(monkeypatch, scheduler)
+    assert scheduler.ledger.deliveries[(GUILD['id'], SLOT)]['status'] == 'delivered'
+    assert scheduler.tick(SLOT) == 0
+
+
+def test_failed_join_delivery_is_left_to_the_schedule(monkeypatch, clock):
+    scheduler = Scheduler(monkeypatch, delivered=False)
+    clock[0] = SLOT - timedelta(minutes=2)
+    assert not join(monkeypatch, scheduler)
+    assert scheduler.ledger.deliveries == {}
+    assert scheduler.tick(SLOT) == 1
@@ -0,0 +1,54 @@
+import asyncio
+
+import send_queue
+from send_queue import RATE_LIMIT_MARGIN, RateBucket, SendQueue
+
+
+def test_rate_bucket_sends_up_to_rate_requests_at_once():
+    bucket = RateBucket(5, 5.0)
+    assert [bucket.reserve(0.0) for _ in range(5)] == [0.0] * 5
+
+
+def test_rate_bucket_delays_requests_over_rate_to_next_window():
+    bucket = RateBucket(5, 5.0)
+    send_times = [bucket.reserve(0.0) for _ in range(12)]
+    window = 5.0 + RATE_LIMIT_MARGIN
+    assert send_times[5:10] == [window] * 5
+    assert send_times[10:] == [2 * window] * 2
+
+
+def test_rate_bucket_keeps_sliding_window():
+    bucket = RateBucket(2, 1.0)
+    assert bucket.reserve(0.0) == 0.0
+    assert bucket.reserve(0.5) == 0.5
+    assert bucket.reserve(0.6) == 1.0 + RATE_LIMIT_MARGIN
+    assert bucket.reserve(10.0) == 10.0
+
+
+def test_rate_bucket_is_idle_once_its_window_has_passed():
+    bucket = RateBucket(1, 1.0)
+    assert bucket.is_idle(0.0)
+    bucket.reserve(0.0)
+    assert not bucket.is_idle(1.0)
+    assert bucket.is_idle(1.0 + RATE_LIMIT_MARGIN)
+
+
+def test_send_queue_paces_requests_of_a_channel(monkeypatch):
+    now = [0.0]
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+        now[0] += delay
+
+    monkeypatch.setattr(send_queue.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(send_queue.asyncio, 'sleep', sleep)
+    queue = SendQueue(global_rate=50)
+
+    async def main():
+        for _ in range(2):
+            await queue.acquire('delete', 1)
+
+    asyncio.run(main())
+    assert delays == [1.0 + RATE_LIMIT_MARGIN]
+    assert queue.stats.sent == 2
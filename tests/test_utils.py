@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from utils import delivery_minute, delivery_slots, guild_shard_id
+
+GUILD_ID = 773196224975077437
+
+
+def test_delivery_minute_is_stable_and_within_hour():
+    assert 0 <= delivery_minute(GUILD_ID) < 60
+    assert delivery_minute(GUILD_ID) == delivery_minute(GUILD_ID)
+
+
+def test_delivery_slots_within_period():
+    minute = delivery_minute(GUILD_ID)
+    since = datetime(2021, 1, 10, 11, 59)
+    until = datetime(2021, 1, 10, 12, 59)
+    assert delivery_slots(GUILD_ID, 12, since, until) == [datetime(2021, 1, 10, 12, minute)]
+
+
+def test_delivery_slots_excludes_start_and_includes_end_of_period():
+    slot = datetime(2021, 1, 10, 12, delivery_minute(GUILD_ID))
+    assert delivery_slots(GUILD_ID, 12, slot, slot + timedelta(hours=1)) == []
+    assert delivery_slots(GUILD_ID, 12, slot - timedelta(hours=1), slot) == [slot]
+
+
+def test_delivery_slots_wraps_around_midnight():
+    minute = delivery_minute(GUILD_ID)
+    since = datetime(2021, 1, 10, 23, 30)
+    until = datetime(2021, 1, 11, 1, 0)
+    assert delivery_slots(GUILD_ID, 0, since, until) == [datetime(2021, 1, 11, 0, minute)]
+
+
+def test_delivery_slots_of_hour_before_midnight_seen_after_midnight():
+    minute = delivery_minute(GUILD_ID)
+    since = datetime(2021, 1, 10, 23, 0) - timedelta(minutes=1)
+    until = datetime(2021, 1, 11, 0, 30)
+    assert delivery_slots(GUILD_ID, 23, since, until) == [datetime(2021, 1, 10, 23, minute)]
+
+
+def test_delivery_slots_of_long_period_are_daily():
+    since = datetime(2021, 1, 10, 0, 0)
+    slots = delivery_slots(GUILD_ID, 12, since, since + timedelta(days=3))
+    assert len(slots) == 3
+    assert all(later - earlier == timedelta(days=1) for earlier, later in zip(slots, slots[1:]))
+
+
+def test_guild_shard_id_matches_discord_formula():
+    assert guild_shard_id(GUILD_ID, 1) == 0
+    assert guild_shard_id(GUILD_ID, 4) == (GUILD_ID >> 22) % 4
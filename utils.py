@@ -1,3 +1,6 @@
+import asyncio
+import zlib
+from datetime import datetime, timedelta
 from typing import List
 
 import discord
@@ -7,7 +10,7 @@ import settings
 
 async def initialize_channels(guild: discord.Guild) -> (discord.CategoryChannel, List[discord.TextChannel]):
     """Function that checks whether all channels and category required by the bot are present in the Guild,
-    and if not, creates them.
+    and if not, creates them. Missing channels are created concurrently.
 
     :param guild: discord.py Guild class object.
     :return: tuple of discord.py Category class object and list of Channel class objects.
@@ -20,16 +23,33 @@ async def initialize_channels(guild: discord.Guild) -> (discord.CategoryChannel,
 #         await category.set_permissions(role, send_messages=False)
     await category.set_permissions(guild.me, send_messages=True)
 
-    channels_list = []
-
-    for channel_name in settings.CHANNELS_SETTINGS.keys():
+    async def get_or_create_channel(channel_name: str) -> discord.TextChannel:
         channel = discord.utils.find(lambda c: c.name == channel_name
                                      and c.category_id == category.id, guild.channels)
         if not channel:
             channel = await guild.create_text_channel(name=channel_name, category=category)
-        channels_list.append(channel)
+        return channel
+
+    channels_list = await asyncio.gather(*(get_or_create_channel(channel_name)
+                                           for channel_name in settings.CHANNELS_SETTINGS.keys()))
+    return category, list(channels_list)
 
-    return category, channels_list
+
+def get_channel_settings(store: str, min_retail_price: int, max_retail_price: int) -> dict:
+    """Helper function to find settings of the channel with given store and retail price band
+    in settings.CHANNELS_SETTINGS.
+
+    :param store: Store name of the channel.
+    :param min_retail_price: Minimum retail price of the deals in the channel.
+    :param max_retail_price: Maximum retail price of the deals in the channel.
+    :return: Channel settings, or empty dict if there is no channel with given store and retail price band.
+    """
+    for channel_settings in settings.CHANNELS_SETTINGS.values():
+        if (channel_settings['store'] == store
+                and channel_settings['min_retail_price'] == min_retail_price
+                and channel_settings['max_retail_price'] == max_retail_price):
+            return channel_settings
+    return {}
 
 
 def replace_all(text: str, replace_dict: dict) -> str:
@@ -75,3 +95,43 @@ def colour_picker(percentage: int) -> discord.Colour:
     if 50 <= percentage < 75:
         return discord.Colour.blue()
     return discord.Colour.gold()
+
+
+def delivery_minute(discord_id: int) -> int:
+    """Helper function to calculate minute of the hour, that deals are delivered at to the Guild.
+    The minute is derived from the Guild ID, so it stays the same between runs and spreads guilds
+    with the same delivery hour evenly across the whole hour.
+
+    :param discord_id: ID of the Guild in Discord.
+    :return: Minute of the hour, number between 0 and 59.
+    """
+    return zlib.crc32(str(discord_id).encode()) % 60
+
+
+def delivery_slots(discord_id: int, hour: int, since: datetime, until: datetime) -> List[datetime]:
+    """Helper function to list times the deals are scheduled to be delivered at to the Guild within given period.
+
+    :param discord_id: ID of the Guild in Discord.
+    :param hour: Delivery hour of the Guild.
+    :param since: Start of the period, exclusive.
+    :param until: End of the period, inclusive.
+    :return: List of scheduled delivery times, in chronological order.
+    """
+    slot = since.replace(hour=hour, minute=delivery_minute(discord_id), second=0, microsecond=0)
+    if slot <= since:
+        slot += timedelta(days=1)
+    slots = []
+    while slot <= until:
+        slots.append(slot)
+        slot += timedelta(days=1)
+    return slots
+
+
+def guild_shard_id(discord_id: int, shard_count: int) -> int:
+    """Helper function to calculate ID of the shard that receives events of the Guild, the same way Discord does.
+
+    :param discord_id: ID of the Guild in Discord.
+    :param shard_count: Total amount of shards of the bot.
+    :return: ID of the shard, number between 0 and shard_count - 1.
+    """
+    return (discord_id >> 22) % shard_count